@@ -3,9 +3,22 @@
 from .openai_embeddings import OpenAIEmbeddings
 from .local_embeddings import LocalEmbeddings
 from .huggingface_embeddings import HuggingFaceEmbeddings
+from .hashing_embeddings import HashingEmbeddings
+from .batcher import MicroBatcher
+from .cache import CachedEmbeddingFunction, EmbeddingCache
+from .registry import EmbeddingModelRegistry, SharedEmbeddingFunction
+from .server import EmbeddingClient, EmbeddingServer
 
 __all__ = [
     "OpenAIEmbeddings",
     "LocalEmbeddings",
     "HuggingFaceEmbeddings",
+    "HashingEmbeddings",
+    "MicroBatcher",
+    "EmbeddingCache",
+    "CachedEmbeddingFunction",
+    "EmbeddingModelRegistry",
+    "SharedEmbeddingFunction",
+    "EmbeddingClient",
+    "EmbeddingServer",
 ]
@@ -0,0 +1,116 @@
+"""Micro-batching of concurrent embedding requests."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Sequence
+
+
+class _Request:
+    __slots__ = ("text", "result", "error", "done")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.done = False
+
+
+class MicroBatcher:
+    """Merge embedding calls from many threads into batched model calls.
+
+    Callers queue their texts; the first caller to find no batch in flight
+    becomes the leader, waits up to ``max_wait`` seconds (or until
+    ``max_batch`` texts are queued), runs one ``embed_fn`` call for the whole
+    queue and hands each caller its own vectors.  No background thread is
+    needed, so an idle batcher costs nothing.  Calls with ``max_batch`` or
+    more texts skip the queue.
+
+    The batcher is callable with Chroma's ``input`` argument, so it can stand
+    in for an embedding function (other attributes are forwarded to
+    ``embed_fn``).  ``batches`` and ``items`` count model calls
+    and embedded texts.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Sequence[Any]],
+        max_batch: int = 32,
+        max_wait: float = 0.002,
+    ) -> None:
+        self.embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._pending: List[_Request] = []
+        self._leading = False
+        self._cond = threading.Condition()
+
+    def __call__(self, input: Iterable[str]) -> List[Any]:  # ``input`` is the name Chroma expects
+        return self.embed(input)
+
+    def embed(self, texts: Iterable[str]) -> List[Any]:
+        """Return one vector per text, batched with concurrent callers."""
+        texts = list(texts)
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch:
+            return self._run(texts)
+        requests = [_Request(text) for text in texts]
+        with self._cond:
+            self._pending.extend(requests)
+            self._cond.notify_all()
+        while True:
+            with self._cond:
+                while self._leading and not all(r.done for r in requests):
+                    self._cond.wait()
+                if all(r.done for r in requests):
+                    break
+                self._leading = True
+            self._lead()
+        for request in requests:
+            if request.error is not None:
+                raise request.error
+        return [request.result for request in requests]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.embed_fn, name)
+
+    async def aembed(self, texts: Iterable[str]) -> List[Any]:
+        """Awaitable :meth:`embed` for coroutines (waits in a worker thread)."""
+        return await asyncio.to_thread(self.embed, list(texts))
+
+    def _run(self, texts: List[str]) -> List[Any]:
+        vectors = list(self.embed_fn(texts))
+        with self._cond:
+            self.batches += 1
+            self.items += len(texts)
+        return vectors
+
+    def _lead(self) -> None:
+        try:
+            deadline = time.monotonic() + self.max_wait
+            with self._cond:
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+            try:
+                vectors = self._run([request.text for request in batch])
+                for request, vector in zip(batch, vectors):
+                    request.result = vector
+            except Exception as exc:
+                for request in batch:
+                    request.error = exc
+            for request in batch:
+                request.done = True
+        finally:
+            with self._cond:
+                self._leading = False
+                self._cond.notify_all()
@@ -0,0 +1,61 @@
+"""Helpers for the batched ``embed_array`` path of the embedders."""
+
+from __future__ import annotations
+
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List
+
+import numpy as np
+
+# Texts embedded per step; bounds the temporary memory of one step.
+EMBED_CHUNK_SIZE = 4096
+
+
+def iter_chunks(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yield lists of at most ``size`` texts from any iterable."""
+    iterator = iter(texts)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def embed_in_chunks(
+    texts: Iterable[str],
+    embed_chunk: Callable[[List[str]], np.ndarray],
+    chunk_size: int = EMBED_CHUNK_SIZE,
+) -> np.ndarray:
+    """Embed ``texts`` ``chunk_size`` at a time into one C-contiguous float32 array.
+
+    Sized inputs are written into a preallocated array; generators are
+    consumed lazily and their chunks concatenated at the end.
+    """
+    total = len(texts) if hasattr(texts, "__len__") else None
+    out: np.ndarray | None = None
+    parts: List[np.ndarray] = []
+    done = 0
+    for chunk in iter_chunks(texts, chunk_size):
+        vectors = np.asarray(embed_chunk(chunk), dtype=np.float32)
+        if total is None:
+            parts.append(vectors)
+            continue
+        if out is None:
+            out = np.empty((total, vectors.shape[1]), dtype=np.float32)
+        out[done : done + len(vectors)] = vectors
+        done += len(vectors)
+    if total is not None:
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
+    if not parts:
+        return np.empty((0, 0), dtype=np.float32)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def hash_vectors(texts: List[str], hash_fn: Callable, dimension: int) -> np.ndarray:
+    """Vectorized form of the digest-bytes / 255 embeddings of the mock backends."""
+    digests = [hash_fn(text.encode("utf-8")).digest() for text in texts]
+    size = len(digests[0]) if digests else 0
+    raw = np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(len(digests), size)
+    vectors = raw[:, :dimension].astype(np.float32)
+    vectors /= 255
+    return vectors
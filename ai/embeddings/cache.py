@@ -0,0 +1,164 @@
+"""Content-addressed on-disk cache of computed embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# SQLite caps bound parameters per statement; stay well below the limit.
+LOOKUP_CHUNK = 500
+
+_SHARED: Dict[str, "EmbeddingCache"] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite table of float32 vectors keyed by ``(model, dimension, sha256(text))``.
+
+    :meth:`embed` looks every text up in bulk, computes only the misses with
+    one call to the embedder and stores them in a single transaction, so
+    re-indexing unchanged data costs a few indexed reads.  Models with a
+    fixed native size (e.g. sentence-transformers) use ``dimension=0``.
+    """
+
+    def __init__(self, path: str | Path = "vector_store/embedding_cache.sqlite3") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                digest BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, dimension, digest)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path: str | Path) -> "EmbeddingCache":
+        """Return one process-wide cache per database file."""
+        key = str(Path(path).resolve())
+        with _SHARED_LOCK:
+            cache = _SHARED.get(key)
+            if cache is None:
+                cache = _SHARED[key] = cls(path)
+            return cache
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, dimension: int, digests: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the cached vectors among ``digests``."""
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            for start in range(0, len(unique), LOOKUP_CHUNK):
+                chunk = unique[start : start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model = ? AND dimension = ? AND digest IN ({placeholders})",
+                    (model, dimension, *chunk),
+                )
+                for digest, vector in rows:
+                    found[bytes(digest)] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, dimension: int, items: Iterable[tuple[bytes, Any]]) -> None:
+        """Store ``(digest, vector)`` pairs in one transaction."""
+        rows = [
+            (model, dimension, digest, np.asarray(vector, dtype=np.float32).tobytes())
+            for digest, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+
+    def embed(
+        self,
+        model: str,
+        dimension: int,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Any]],
+    ) -> List[List[float]]:
+        """Return embeddings for ``texts``, calling ``compute`` for cache misses only."""
+        return self.embed_array(model, dimension, texts, compute).tolist()
+
+    def embed_array(
+        self,
+        model: str,
+        dimension: int,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Any]],
+    ) -> np.ndarray:
+        """Like :meth:`embed` but return a ``(len(texts), dim)`` float32 array."""
+        digests = [text_digest(text) for text in texts]
+        found = self.get_many(model, dimension, digests)
+        missing: Dict[bytes, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found:
+                missing.setdefault(digest, text)
+        if missing:
+            vectors = compute(list(missing.values()))
+            computed = list(zip(missing.keys(), vectors))
+            self.put_many(model, dimension, computed)
+            found.update((digest, np.asarray(vector, dtype=np.float32)) for digest, vector in computed)
+        if not digests:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[digest] for digest in digests])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddingFunction:
+    """Chroma embedding function reading through an :class:`EmbeddingCache`.
+
+    ``model`` may be a callable returning the model name (e.g. asking an
+    embedding server); it is resolved on the first call rather than at
+    construction.  A call made while the name cannot be resolved embeds
+    without the cache.
+    """
+
+    def __init__(
+        self, function: Callable, cache: EmbeddingCache, model: str | Callable[[], str], dimension: int = 0
+    ) -> None:
+        self.function = function
+        self.cache = cache
+        self.model = model
+        self.dimension = dimension
+
+    def _model_name(self) -> str | None:
+        if callable(self.model):
+            try:
+                self.model = self.model()
+            except OSError:
+                return None
+        return self.model
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        model = self._model_name()
+        if model is None:
+            return np.asarray(self.function(list(input)), dtype=np.float32).tolist()
+        return self.cache.embed(model, self.dimension, list(input), self.function)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.function, name)
@@ -0,0 +1,185 @@
+"""Model-free embeddings from hashed word and character n-grams."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import threading
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from .batching import EMBED_CHUNK_SIZE, embed_in_chunks
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+class HashingEmbeddings:
+    """TF-IDF vectors over hashed n-grams, computed on the CPU without a model.
+
+    Every word n-gram (``word_ngrams``) and character n-gram of each word
+    (``char_ngrams``, so typos and inflections still overlap) is hashed into
+    one of ``dimension`` buckets with a pseudo-random sign that cancels
+    collisions on average.  Term counts are damped with ``1 + log(tf)`` and,
+    once :meth:`fit` (or :meth:`partial_fit`) has seen a corpus, weighted by
+    smoothed IDF.  Vectors are L2-normalized, so dot products are cosine
+    similarities.  :meth:`embed_sparse` returns the non-zero buckets only.
+
+    Query vectors must use the IDF weights of the indexed corpus:
+    :meth:`save` writes the settings and statistics and :meth:`load`
+    restores them in another process.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 512,
+        word_ngrams: Tuple[int, int] = (1, 2),
+        char_ngrams: Tuple[int, int] | None = (3, 5),
+        sublinear_tf: bool = True,
+    ) -> None:
+        self.dimension = dimension
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+        self.sublinear_tf = sublinear_tf
+        self.documents = 0
+        self._df = np.zeros(dimension, dtype=np.int64)
+        self._idf: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Features
+    def features(self, text: str) -> List[str]:
+        """Return the word and character n-grams hashed for ``text``."""
+        words = _WORD.findall(text.lower())
+        features = []
+        low, high = self.word_ngrams
+        for n in range(low, high + 1):
+            features.extend("w:" + " ".join(words[i : i + n]) for i in range(len(words) - n + 1))
+        if self.char_ngrams:
+            low, high = self.char_ngrams
+            for word in words:
+                padded = f" {word} "
+                for n in range(low, min(high, len(padded)) + 1):
+                    features.extend("c:" + padded[i : i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _term_weights(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(buckets, signed term weights)`` before IDF and normalization."""
+        counts: dict[int, float] = {}
+        for feature in self.features(text):
+            h = _feature_hash(feature)
+            bucket = h % self.dimension
+            counts[bucket] = counts.get(bucket, 0.0) + (-1.0 if h & 0x80000000 else 1.0)
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        keep = values != 0
+        buckets, values = buckets[keep], values[keep]
+        if self.sublinear_tf:
+            values = np.sign(values) * (1.0 + np.log(np.abs(values)))
+        return buckets, values
+
+    # ------------------------------------------------------------------
+    # IDF statistics
+    def partial_fit(self, texts: Iterable[str]) -> "HashingEmbeddings":
+        """Add ``texts`` to the document-frequency statistics."""
+        with self._lock:
+            for text in texts:
+                buckets, _ = self._term_weights(text)
+                self._df[buckets] += 1
+                self.documents += 1
+            self._idf = None
+        return self
+
+    def fit(self, texts: Iterable[str]) -> "HashingEmbeddings":
+        """Reset and compute document frequencies from ``texts``."""
+        with self._lock:
+            self._df[:] = 0
+            self.documents = 0
+        return self.partial_fit(texts)
+
+    @property
+    def idf(self) -> np.ndarray | None:
+        """Smoothed ``log((1 + N) / (1 + df)) + 1`` per bucket, ``None`` before fitting."""
+        if not self.documents:
+            return None
+        if self._idf is None:
+            self._idf = np.log((1.0 + self.documents) / (1.0 + self._df)) + 1.0
+        return self._idf
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of the settings and statistics the vectors depend on."""
+        digest = hashlib.sha256(self._params().tobytes())
+        digest.update(self._df.tobytes())
+        return digest.hexdigest()[:12]
+
+    # ------------------------------------------------------------------
+    # Serialization
+    def _params(self) -> np.ndarray:
+        char_low, char_high = self.char_ngrams or (-1, -1)
+        return np.array(
+            [self.dimension, *self.word_ngrams, char_low, char_high, int(self.sublinear_tf), self.documents],
+            dtype=np.int64,
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Write the settings and document frequencies to an ``.npz`` file."""
+        with self._lock:
+            arrays = {"params": self._params(), "df": self._df.copy()}
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "HashingEmbeddings":
+        """Restore an embedder written by :meth:`save`."""
+        with np.load(path) as data:
+            dimension, word_low, word_high, char_low, char_high, sublinear, documents = data["params"].tolist()
+            embedder = cls(
+                dimension=dimension,
+                word_ngrams=(word_low, word_high),
+                char_ngrams=None if char_low < 0 else (char_low, char_high),
+                sublinear_tf=bool(sublinear),
+            )
+            embedder._df[:] = data["df"]
+        embedder.documents = documents
+        return embedder
+
+    # ------------------------------------------------------------------
+    # Embedding
+    def embed_sparse(self, texts: Iterable[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Return one ``(int32 buckets, float32 weights)`` pair per text."""
+        idf = self.idf
+        vectors = []
+        for text in texts:
+            buckets, values = self._term_weights(text)
+            if idf is not None:
+                values = values * idf[buckets]
+            norm = math.sqrt(float(values @ values)) if values.size else 0.0
+            if norm:
+                values = values / norm
+            order = np.argsort(buckets)
+            vectors.append((buckets[order].astype(np.int32), values[order].astype(np.float32)))
+        return vectors
+
+    def _dense_chunk(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, (buckets, values) in enumerate(self.embed_sparse(texts)):
+            out[row, buckets] = values
+        return out
+
+    def embed_array(self, texts: Iterable[str], chunk_size: int = EMBED_CHUNK_SIZE) -> np.ndarray:
+        """Return dense float32 embeddings, ``chunk_size`` texts per step."""
+        return embed_in_chunks(texts, self._dense_chunk, chunk_size)
+
+    def embed(self, texts: Iterable[str]) -> List[List[float]]:
+        """Return dense embeddings as lists."""
+        return self.embed_array(texts).tolist()
@@ -1,20 +1,50 @@
 """Local embedding generation utilities."""
 
+from __future__ import annotations
+
 from hashlib import md5
 from typing import Iterable, List
 
+import numpy as np
+
+from .batching import EMBED_CHUNK_SIZE, embed_in_chunks, hash_vectors
+from .cache import EmbeddingCache
+
 
 class LocalEmbeddings:
     """Generate embeddings using a local algorithm."""
 
-    def __init__(self, dimension: int = 3) -> None:
+    def __init__(self, dimension: int = 3, cache: EmbeddingCache | None = None) -> None:
         self.dimension = dimension
+        self.cache = cache
 
     def embed(self, texts: Iterable[str]) -> List[List[float]]:
         """Return deterministic local embeddings for the provided texts."""
+        texts = list(texts)
+        if self.cache is not None:
+            return self.cache.embed("local", self.dimension, texts, self._embed)
+        return self._embed(texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
         vectors: List[List[float]] = []
         for text in texts:
             digest = md5(text.encode("utf-8")).digest()
             vector = [b / 255 for b in digest[: self.dimension]]
             vectors.append(vector)
         return vectors
+
+    def embed_array(self, texts: Iterable[str], chunk_size: int = EMBED_CHUNK_SIZE) -> np.ndarray:
+        """Return embeddings as one contiguous float32 array.
+
+        Accepts any iterable (including generators) and embeds it
+        ``chunk_size`` texts at a time.
+        """
+        return embed_in_chunks(texts, self._embed_chunk, chunk_size)
+
+    def _embed_chunk(self, texts: List[str]) -> np.ndarray:
+        if self.cache is not None:
+            return self.cache.embed_array("local", self.dimension, texts, self._vectors)
+        return self._vectors(texts)
+
+    def _vectors(self, texts: List[str]) -> np.ndarray:
+        return hash_vectors(texts, md5, self.dimension)
@@ -1,21 +1,49 @@
 """Placeholder OpenAI embeddings implementation."""
 
+from __future__ import annotations
+
 from hashlib import sha256
 from typing import Iterable, List
 
+import numpy as np
+
+from .batching import EMBED_CHUNK_SIZE, embed_in_chunks, hash_vectors
+from .cache import EmbeddingCache
+
 
 class OpenAIEmbeddings:
     """Generate embeddings using the OpenAI API (mocked)."""
 
-    def __init__(self, api_key: str | None = None, dimension: int = 3) -> None:
+    def __init__(
+        self, api_key: str | None = None, dimension: int = 3, cache: EmbeddingCache | None = None
+    ) -> None:
         self.api_key = api_key
         self.dimension = dimension
+        self.cache = cache
 
     def embed(self, texts: Iterable[str]) -> List[List[float]]:
         """Return deterministic embeddings for the provided texts."""
+        texts = list(texts)
+        if self.cache is not None:
+            return self.cache.embed("openai", self.dimension, texts, self._embed)
+        return self._embed(texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
         results: List[List[float]] = []
         for text in texts:
             digest = sha256(text.encode("utf-8")).digest()
             vector = [b / 255 for b in digest[: self.dimension]]
             results.append(vector)
         return results
+
+    def embed_array(self, texts: Iterable[str], chunk_size: int = EMBED_CHUNK_SIZE) -> np.ndarray:
+        """Return :meth:`embed` results as a float32 array, ``chunk_size`` texts per step."""
+        return embed_in_chunks(texts, self._embed_chunk, chunk_size)
+
+    def _embed_chunk(self, texts: List[str]) -> np.ndarray:
+        if self.cache is not None:
+            return self.cache.embed_array("openai", self.dimension, texts, self._vectors)
+        return self._vectors(texts)
+
+    def _vectors(self, texts: List[str]) -> np.ndarray:
+        return hash_vectors(texts, sha256, self.dimension)
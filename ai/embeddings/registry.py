@@ -0,0 +1,87 @@
+"""Process-wide registry sharing loaded embedding models."""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+from .batcher import MicroBatcher
+
+_MODELS: Dict[Hashable, "SharedEmbeddingFunction"] = {}
+_BATCHERS: Dict[Hashable, MicroBatcher] = {}
+# Batchers over embedder objects, dropped together with their embedder.
+_EMBEDDER_BATCHERS: "weakref.WeakKeyDictionary[Any, MicroBatcher]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+class SharedEmbeddingFunction:
+    """Wrap an embedding callable so concurrent calls run one at a time.
+
+    Model weights and tokenizers are not guaranteed to be thread safe, and
+    FastAPI runs sync endpoints on a thread pool, so calls are serialized
+    with a lock.  Other attributes are forwarded to the wrapped object.
+    """
+
+    def __init__(self, function: Callable) -> None:
+        self.function = function
+        self._lock = threading.Lock()
+
+    def __call__(self, input: Any) -> Any:  # ``input`` is the name Chroma expects
+        with self._lock:
+            return self.function(input)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.function, name)
+
+
+class EmbeddingModelRegistry:
+    """Load each embedding model once per process and share it everywhere."""
+
+    @staticmethod
+    def get(key: Hashable, factory: Callable[[], Callable]) -> SharedEmbeddingFunction:
+        """Return the model registered under ``key``, building it with ``factory`` once."""
+        model = _MODELS.get(key)
+        if model is None:
+            with _LOCK:
+                model = _MODELS.get(key)
+                if model is None:
+                    model = _MODELS[key] = SharedEmbeddingFunction(factory())
+        return model
+
+    @staticmethod
+    def batched(key: Hashable, factory: Callable[[], Callable], **batch_params: Any) -> MicroBatcher:
+        """Return the process-wide :class:`MicroBatcher` over the model ``key``.
+
+        Concurrent queries from every tenant share one batcher per model.
+        """
+        model = EmbeddingModelRegistry.get(key, factory)
+        with _LOCK:
+            batcher = _BATCHERS.get(key)
+            if batcher is None:
+                batcher = _BATCHERS[key] = MicroBatcher(model, **batch_params)
+        return batcher
+
+    @staticmethod
+    def batched_embedder(embedder: Any, **batch_params: Any) -> MicroBatcher:
+        """Return the process-wide :class:`MicroBatcher` over ``embedder.embed``.
+
+        Every caller embedding through the same embedder object shares one
+        batcher; it is released when the embedder is garbage collected.
+        """
+        with _LOCK:
+            batcher = _EMBEDDER_BATCHERS.get(embedder)
+            if batcher is None:
+                # A weak reference, or the batcher would keep its key alive.
+                ref = weakref.ref(embedder)
+                batcher = MicroBatcher(lambda texts: ref().embed(texts), **batch_params)
+                _EMBEDDER_BATCHERS[embedder] = batcher
+        return batcher
+
+    @staticmethod
+    def clear() -> None:
+        """Drop every loaded model (mainly for tests)."""
+        with _LOCK:
+            _MODELS.clear()
+            _BATCHERS.clear()
+            _EMBEDDER_BATCHERS.clear()
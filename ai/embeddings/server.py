@@ -0,0 +1,200 @@
+"""Local embedding server shared by all API worker processes.
+
+One process owns the model and answers batched embed requests over a Unix
+socket, so uvicorn workers neither load their own copy of the weights nor
+pay its warm-up.  Start it with::
+
+    python scripts/embedding_server.py --socket /tmp/smartbase-embed.sock
+
+and point the workers at it through ``SMARTBASE_EMBEDDING_SOCKET``
+(``scripts/run_server.py --embedding-socket`` does both).
+
+Wire format, both directions length-prefixed and little endian::
+
+    request   uint32 size, UTF-8 JSON list of texts
+    response  uint32 rows, uint32 dim, rows * dim float32
+    error     uint32 0xFFFFFFFF, uint32 size, UTF-8 message
+
+    info      uint32 size, UTF-8 JSON {"op": "info"}
+    reply     uint32 size, UTF-8 JSON {"model": name}
+
+The info exchange tells clients which model the server runs, so vectors
+can be cached under the right model name.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Callable, Iterable, List, Sequence
+
+import numpy as np
+
+from .batcher import MicroBatcher
+
+EMBEDDING_SOCKET_ENV = "SMARTBASE_EMBEDDING_SOCKET"
+ERROR = 0xFFFFFFFF
+_U32 = struct.Struct("<I")
+_SHAPE = struct.Struct("<II")
+# Keeps this module importable on platforms without Unix sockets.
+_UnixStreamServer = getattr(socketserver, "UnixStreamServer", socketserver.TCPServer)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try:
+                (size,) = _U32.unpack(_recv_exact(self.request, _U32.size))
+                texts = json.loads(_recv_exact(self.request, size).decode("utf-8"))
+            except (ConnectionError, OSError):
+                return
+            if isinstance(texts, dict):
+                info = json.dumps({"model": self.server.model}).encode("utf-8")
+                try:
+                    self.request.sendall(_U32.pack(len(info)) + info)
+                except OSError:
+                    return
+                continue
+            try:
+                vectors = self.server.embed(texts)
+                payload = _SHAPE.pack(*vectors.shape) + vectors.tobytes()
+            except Exception as exc:
+                message = f"{type(exc).__name__}: {exc}".encode("utf-8")
+                payload = _SHAPE.pack(ERROR, len(message)) + message
+            try:
+                self.request.sendall(payload)
+            except OSError:  # the client gave up (e.g. timed out)
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, _UnixStreamServer):
+    """Serve ``embed_fn`` on ``socket_path``, one thread per connection.
+
+    Requests arriving together from different workers are merged by a
+    :class:`~ai.embeddings.batcher.MicroBatcher` into one model call.
+    ``model`` names the served model (and its settings) to clients.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        embed_fn: Callable[[List[str]], Sequence[Any]],
+        max_batch: int = 64,
+        max_wait: float = 0.002,
+        model: str = "",
+    ) -> None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.model = model
+        self.batcher = MicroBatcher(embed_fn, max_batch=max_batch, max_wait=max_wait)
+        super().__init__(socket_path, _Handler)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(self.batcher.embed(texts), dtype=np.float32)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class EmbeddingClient:
+    """Embedding backend talking to an :class:`EmbeddingServer`.
+
+    Offers the embedder API (``embed``/``embed_array``) and is callable like
+    a Chroma embedding function.  Each thread keeps its own connection and
+    reconnects once if the server was restarted.
+    """
+
+    def __init__(self, socket_path: str, timeout: float | None = 30.0) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._model: str | None = None
+
+    @property
+    def model(self) -> str:
+        """Name of the model the server runs (asked once, then remembered).
+
+        Servers that do not name their model are identified by their socket.
+        """
+        if self._model is None:
+            with self._open() as sock:
+                request = json.dumps({"op": "info"}).encode("utf-8")
+                sock.sendall(_U32.pack(len(request)) + request)
+                (size,) = _U32.unpack(_recv_exact(sock, _U32.size))
+                info = json.loads(_recv_exact(sock, size).decode("utf-8"))
+            self._model = info.get("model") or f"embedding-server:{self.socket_path}"
+        return self._model
+
+    def _open(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _connect(self) -> socket.socket:
+        sock = self._open()
+        self._local.sock = sock
+        return sock
+
+    def _request(self, sock: socket.socket, payload: bytes) -> np.ndarray:
+        try:
+            sock.sendall(_U32.pack(len(payload)) + payload)
+            rows, dim = _SHAPE.unpack(_recv_exact(sock, _SHAPE.size))
+            if rows == ERROR:
+                message = _recv_exact(sock, dim).decode("utf-8")
+            else:
+                data = _recv_exact(sock, rows * dim * 4)
+        except BaseException:
+            # A half-read reply (e.g. after a timeout) would be returned to
+            # the next request, so the connection cannot be reused.
+            sock.close()
+            self._local.sock = None
+            raise
+        if rows == ERROR:
+            raise RuntimeError(f"Embedding server error: {message}")
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, dim)
+
+    def embed_array(self, texts: Iterable[str]) -> np.ndarray:
+        """Return embeddings for ``texts`` as a float32 array."""
+        payload = json.dumps(list(texts)).encode("utf-8")
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                return self._request(sock, payload)
+            except (ConnectionError, BrokenPipeError):
+                pass  # the server was restarted; reconnect once
+        return self._request(self._connect(), payload)
+
+    def embed(self, texts: Iterable[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def __call__(self, input: Iterable[str]) -> List[List[float]]:  # ``input`` is the name Chroma expects
+        return self.embed(input)
+
+    def close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
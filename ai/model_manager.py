@@ -1,5 +1,7 @@
 """Utility for selecting models based on tenant configuration."""
 
+from typing import Iterator
+
 from config.tenant_config import TenantConfig
 from .models import (
     OpenAIModel,
@@ -41,3 +43,7 @@ class ModelManager:
     def generate(self, prompt: str, **kwargs) -> str:
         """Delegate text generation to the underlying model."""
         return self.model.generate(prompt, **kwargs)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Delegate streaming text generation to the underlying model."""
+        return self.model.stream(prompt, **kwargs)
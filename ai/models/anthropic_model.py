@@ -1,6 +1,6 @@
 """Simplified Anthropic model wrapper."""
 
-from typing import Any
+from typing import Any, Iterator
 
 
 class AnthropicModel:
@@ -12,3 +12,7 @@ class AnthropicModel:
     def generate(self, prompt: str, **kwargs: Any) -> str:
         """Return a deterministic response for the prompt."""
         return f"[Anthropic] Response to: {prompt}"
+
+    def stream(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        """Yield the response in one fragment."""
+        yield self.generate(prompt, **kwargs)
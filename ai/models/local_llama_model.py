@@ -1,6 +1,6 @@
 """Simplified local LLaMA model wrapper."""
 
-from typing import Any
+from typing import Any, Iterator
 
 
 class LocalLLAMAModel:
@@ -12,3 +12,7 @@ class LocalLLAMAModel:
     def generate(self, prompt: str, **kwargs: Any) -> str:
         """Return a deterministic response for the prompt."""
         return f"[LLaMA] Response to: {prompt}"
+
+    def stream(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        """Yield the response in one fragment."""
+        yield self.generate(prompt, **kwargs)
@@ -1,49 +1,257 @@
-
 """Wrapper for interacting with a local Ollama server."""
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Tuple
 import json
 
 try:  # requests may not be installed in all environments
     import requests
+    from requests.adapters import HTTPAdapter
 except Exception:  # pragma: no cover - dependency missing
     requests = None  # type: ignore[misc]
 
+try:  # httpx is only needed for the async methods
+    import httpx
+except Exception:  # pragma: no cover - dependency missing
+    httpx = None  # type: ignore[misc]
+
+# Keep-alive connection pools shared by every OllamaModel in the process,
+# keyed by ``(base_url, pool_size)``.  Async clients are bound to the event
+# loop that created them, so they are kept per loop.
+_SESSIONS: Dict[Tuple[str, int], "requests.Session"] = {}
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_LOCK = threading.Lock()
+
+
+def close_clients() -> None:
+    """Close the pooled sync sessions (e.g. on application shutdown)."""
+    with _LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
+
+
+async def aclose_clients() -> None:
+    """Close the async clients created on the running event loop."""
+    with _LOCK:
+        clients = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
 
 class OllamaModel:
-    """Generate text using an Ollama model if available."""
+    """Generate text using an Ollama model if available.
+
+    Requests go through a keep-alive connection pool of ``pool_size``
+    connections per server, shared by all instances, so a prompt does not
+    pay a new TCP handshake.  ``connect_timeout`` and ``read_timeout`` bound
+    each request; ``keep_alive`` (e.g. ``"30m"`` or ``-1``) is forwarded to
+    Ollama to keep the model loaded between prompts, and :meth:`warm_up`
+    loads it ahead of the first prompt.  All of these can be set per tenant
+    through the tenant's ``model_config``.
+    """
+
+    # Constructor arguments a tenant's ``model_config`` may set.
+    CONFIG_KEYS = ("model_name", "base_url", "pool_size", "connect_timeout", "read_timeout", "keep_alive", "preload")
 
-    def __init__(self, model_name: str = "llama3.2", base_url: str = "http://localhost:11434") -> None:
+    def __init__(
+        self,
+        model_name: str = "llama3.2",
+        base_url: str = "http://localhost:11434",
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 120.0,
+        keep_alive: str | int | None = None,
+        preload: bool = True,
+    ) -> None:
         self.model_name = model_name
         self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+        self.preload = preload
+
+    # ------------------------------------------------------------------
+    # Connection pools
+    @property
+    def session(self) -> "requests.Session":
+        """Return the process-wide ``requests.Session`` for this server."""
+        key = (self.base_url, self.pool_size)
+        session = _SESSIONS.get(key)
+        if session is None:
+            with _LOCK:
+                session = _SESSIONS.get(key)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    _SESSIONS[key] = session
+        return session
+
+    def async_client(self) -> "httpx.AsyncClient":
+        """Return the ``httpx.AsyncClient`` for this server on the running loop."""
+        loop = asyncio.get_running_loop()
+        key = (self.base_url, self.pool_size)
+        with _LOCK:
+            clients = _ASYNC_CLIENTS.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                limits = httpx.Limits(
+                    max_connections=self.pool_size, max_keepalive_connections=self.pool_size
+                )
+                client = clients[key] = httpx.AsyncClient(limits=limits)
+        return client
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """``(connect, read)`` timeout of every request."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def _httpx_timeout(self) -> "httpx.Timeout":
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        payload = {"model": self.model_name, "prompt": prompt, "stream": stream}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _fallback(self, prompt: str) -> str:
+        return f"[Ollama] Response to: {prompt}"
+
+    # ------------------------------------------------------------------
+    # Sync API
+    def warm_up(self) -> bool:
+        """Ask Ollama to load the model now; return whether it answered.
+
+        A generate request without a prompt only loads the model, so the
+        first real prompt does not pay the model load time.
+        """
+        if requests is None:
+            return False
+        payload = {"model": self.model_name}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        try:
+            r = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            r.raise_for_status()
+        except Exception:
+            return False
+        return True
 
     def generate(self, prompt: str, **kwargs: Any) -> str:
         """Return a response from Ollama or a fallback message."""
         if requests is not None:
             url = f"{self.base_url}/api/generate"
-            payload = {"model": self.model_name, "prompt": prompt, "stream": False}
             try:
-                r = requests.post(url, json=payload, timeout=10)
+                r = self.session.post(url, json=self._payload(prompt, False), timeout=self.timeout)
                 r.raise_for_status()
                 try:
                     data = r.json()
                     if isinstance(data, dict) and "response" in data:
                         return str(data["response"]).strip()
                 except ValueError:
-                    text = ""
-                    for line in r.text.splitlines():
-                        try:
-                            obj = json.loads(line)
-                        except Exception:
-                            continue
-                        text += obj.get("response", "")
-                        if obj.get("done"):
-                            break
+                    text = "".join(self._iter_ndjson(r.text.splitlines()))
                     if text:
                         return text.strip()
             except Exception:  # pragma: no cover - network failures or missing dep
                 pass
-        return f"[Ollama] Response to: {prompt}"
+        return self._fallback(prompt)
+
+    @staticmethod
+    def _parse_line(line: str | bytes) -> Tuple[str, bool]:
+        """Return ``(fragment, done)`` for one line of Ollama's NDJSON stream."""
+        if not line:
+            return "", False
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return "", False
+        return obj.get("response", ""), bool(obj.get("done"))
+
+    @classmethod
+    def _iter_ndjson(cls, lines: Iterable[str | bytes]) -> Iterator[str]:
+        """Yield the ``response`` fragments of Ollama's NDJSON lines until ``done``."""
+        for line in lines:
+            fragment, done = cls._parse_line(line)
+            if fragment:
+                yield fragment
+            if done:
+                break
+
+    def stream(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        """Yield response fragments as Ollama produces them.
+
+        The NDJSON body is parsed line by line while it arrives, so the first
+        fragment is available after the first generated token.  Falls back to
+        the same message as :meth:`generate` if the server cannot be reached
+        before anything was produced.
+        """
+        if requests is not None:
+            url = f"{self.base_url}/api/generate"
+            produced = False
+            try:
+                with self.session.post(
+                    url, json=self._payload(prompt, True), stream=True, timeout=self.timeout
+                ) as r:
+                    r.raise_for_status()
+                    for fragment in self._iter_ndjson(r.iter_lines()):
+                        produced = True
+                        yield fragment
+            except Exception:  # pragma: no cover - network failures or missing dep
+                if produced:
+                    raise
+            if produced:
+                return
+        yield self._fallback(prompt)
 
+    # ------------------------------------------------------------------
+    # Async API
+    async def agenerate(self, prompt: str, **kwargs: Any) -> str:
+        """Awaitable :meth:`generate` using the pooled ``httpx.AsyncClient``."""
+        if httpx is not None:
+            url = f"{self.base_url}/api/generate"
+            try:
+                r = await self.async_client().post(
+                    url, json=self._payload(prompt, False), timeout=self._httpx_timeout()
+                )
+                r.raise_for_status()
+                data = r.json()
+                if isinstance(data, dict) and "response" in data:
+                    return str(data["response"]).strip()
+            except Exception:  # pragma: no cover - network failures
+                pass
+        return self._fallback(prompt)
+
+    async def astream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        """Async :meth:`stream` using the pooled ``httpx.AsyncClient``."""
+        if httpx is not None:
+            url = f"{self.base_url}/api/generate"
+            produced = False
+            try:
+                async with self.async_client().stream(
+                    "POST", url, json=self._payload(prompt, True), timeout=self._httpx_timeout()
+                ) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        fragment, done = self._parse_line(line)
+                        if fragment:
+                            produced = True
+                            yield fragment
+                        if done:
+                            break
+            except Exception:  # pragma: no cover - network failures
+                if produced:
+                    raise
+            if produced:
+                return
+        yield self._fallback(prompt)
@@ -3,8 +3,9 @@
 from typing import Iterable, List, Optional, Sequence, Mapping
 
 from .embeddings import LocalEmbeddings, OpenAIEmbeddings, HuggingFaceEmbeddings
+from .embeddings.registry import EmbeddingModelRegistry
 from .vector_stores import FaissStore
-from .vector_stores.chroma_store import TenantVectorStore
+from .vector_stores.tenant_cache import tenant_stores
 from .models import OpenAIModel
 
 
@@ -19,25 +20,33 @@ class RAGPipeline:
         tenant_id: str | None = None,
     ) -> None:
         if tenant_id:
-            self.store = TenantVectorStore(tenant_id)
+            self.store = tenant_stores.get(tenant_id)
             self.embedder = None
             self.vector_store = None
         else:
             self.embedder = embedder or LocalEmbeddings()
-            self.vector_store = vector_store or FaissStore()
+            # An empty store has len() == 0, so test for None explicitly.
+            self.vector_store = vector_store if vector_store is not None else FaissStore()
             self.store = None
+            # Single-query embeddings from concurrent requests share model
+            # calls, across every pipeline using this embedder.
+            self._query_batcher = EmbeddingModelRegistry.batched_embedder(self.embedder)
         self.model = model or OpenAIModel()
 
     def add_documents(self, texts: Sequence[str], metadata: Optional[Sequence[dict]] = None) -> None:
         """Add documents to the configured vector store."""
         metadata = metadata or [{} for _ in texts]
         if self.store is not None:
-            for idx, text in enumerate(texts):
-                doc_id = metadata[idx].get("id", f"doc{idx}")
-                self.store.add_document(doc_id, text, metadata[idx])
+            ids = [meta.get("id", f"doc{idx}") for idx, meta in enumerate(metadata)]
+            self.store.add_documents(ids, list(texts), list(metadata))
         else:
-            embeddings = self.embedder.embed(texts)
-            self.vector_store.add(embeddings, metadata)
+            self.vector_store.add(self._embed(texts), metadata)
+
+    def _embed(self, texts: Sequence[str]):
+        """Embed ``texts`` as a float32 array when the embedder supports it."""
+        if hasattr(self.embedder, "embed_array"):
+            return self.embedder.embed_array(texts)
+        return self.embedder.embed(texts)
 
     def retrieve_context(self, query: str, top_k: int = 3) -> str:
         """Retrieve contextual documents for a query."""
@@ -48,10 +57,26 @@ class RAGPipeline:
                 documents = documents[0]
             return "\n".join(documents)
 
-        query_emb = self.embedder.embed([query])[0]
+        query_emb = self._query_batcher.embed([query])[0]
         results = self.vector_store.query(query_emb, top_k)
         return "\n".join(meta.get("text", "") for meta, _ in results)
 
+    def retrieve_context_batch(self, queries: Sequence[str], top_k: int = 3) -> List[str]:
+        """Retrieve context for many queries with a single embedding call."""
+        queries = list(queries)
+        if not queries:
+            return []
+        if self.store is not None:
+            results = self.store.hybrid_query_batch(queries, n_results=top_k)
+            return ["\n".join(r["documents"][0]) for r in results]
+
+        embeddings = self._embed(queries)
+        if hasattr(self.vector_store, "query_batch"):
+            batches = self.vector_store.query_batch(embeddings, top_k)
+        else:
+            batches = [self.vector_store.query(emb, top_k) for emb in embeddings]
+        return ["\n".join(meta.get("text", "") for meta, _ in results) for results in batches]
+
     def augment_prompt(self, query: str, history: Iterable[Mapping[str, str]] | None = None, top_k: int = 3) -> str:
         """Combine retrieved context, history and query into a prompt."""
         context = self.retrieve_context(query, top_k=top_k)
@@ -74,7 +99,7 @@ Assistant:"""
             prompt = self.augment_prompt(question, history=history, top_k=top_k)
             return self.model.generate(prompt)
 
-        query_emb = self.embedder.embed([question])[0]
+        query_emb = self._query_batcher.embed([question])[0]
         results = self.vector_store.query(query_emb, top_k)
         context = "\n".join(meta.get("text", "") for meta, _ in results)
         prompt = f"{context}\nQuestion: {question}\nAnswer:"
@@ -3,10 +3,20 @@
 from .faiss_store import FaissStore
 from .chroma_store import ChromaStore, TenantVectorStore
 from .pinecone_store import PineconeStore
+from .retrieval_cache import RetrievalCache, retrieval_cache
+from .sharded_store import ShardedStore
+from .sparse_store import SparseVectorStore
+from .tenant_cache import TenantStoreCache, tenant_stores
 
 __all__ = [
     "FaissStore",
     "ChromaStore",
     "TenantVectorStore",
     "PineconeStore",
+    "RetrievalCache",
+    "retrieval_cache",
+    "ShardedStore",
+    "SparseVectorStore",
+    "TenantStoreCache",
+    "tenant_stores",
 ]
@@ -0,0 +1,137 @@
+"""BM25 lexical ranking and reciprocal rank fusion for hybrid search."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .matrix import top_k_smallest
+
+# Words, keeping dates, times and decimals such as 2024-05-01 or 12:30 whole.
+_TOKEN = re.compile(r"\w+(?:[-:./]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the lowercase terms of ``text``."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index that grows one document at a time.
+
+    Each term maps to parallel ``array('q')`` posting lists of document
+    slots, term frequencies and document lengths, so adding a document
+    touches only its own terms.  :meth:`search` scores just the
+    postings of the query terms and keeps the ``top_k`` best with a partial
+    sort.  Re-adding a ``doc_id`` replaces its text.
+
+    Texts are not kept: each document holds only references to its
+    (interned) terms, and results are document ids, so the caller's own
+    text store (e.g. :class:`~ai.vector_stores.trigram_index.TrigramIndex`)
+    stays the only copy.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: List[str | None] = []
+        self._terms: List[Tuple[str, ...] | None] = []
+        self._lengths = array("q")
+        self._slots: Dict[str, int] = {}
+        self._postings: Dict[str, Tuple[array, array, array]] = {}
+        self._df: Counter = Counter()
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _remove(self, slot: int) -> None:
+        terms = self._terms[slot]
+        self._doc_ids[slot] = self._terms[slot] = None
+        self._total_length -= self._lengths[slot]
+        self._df.subtract(terms)
+
+    def _index(self, doc_id: str, text: str) -> None:
+        previous = self._slots.get(doc_id)
+        if previous is not None:
+            self._remove(previous)
+        slot = len(self._doc_ids)
+        terms = Counter(sys.intern(term) for term in tokenize(text))
+        length = sum(terms.values())
+        self._doc_ids.append(doc_id)
+        self._terms.append(tuple(terms))
+        self._lengths.append(length)
+        self._slots[doc_id] = slot
+        self._total_length += length
+        self._df.update(terms.keys())
+        for term, tf in terms.items():
+            slots, tfs, lengths = self._postings.setdefault(term, (array("q"), array("q"), array("q")))
+            slots.append(slot)
+            tfs.append(tf)
+            lengths.append(length)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index ``text`` under ``doc_id``."""
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Index several ``(doc_id, text)`` pairs."""
+        with self._lock:
+            for doc_id, text in documents:
+                self._index(doc_id, text)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to ``top_k`` ``(doc_id, score)`` pairs, best first."""
+        with self._lock:
+            count = len(self._slots)
+            if not count:
+                return []
+            avg_length = self._total_length / count
+            hits, weights = [], []
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                df = self._df[term]
+                if posting is None or df <= 0:
+                    continue
+                idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+                slots = np.array(posting[0], dtype=np.int64)
+                tfs = np.array(posting[1], dtype=np.float64)
+                lengths = np.array(posting[2], dtype=np.float64)
+                norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+                hits.append(slots)
+                weights.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+            if not hits:
+                return []
+            slots, inverse = np.unique(np.concatenate(hits), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+            live = np.array([self._doc_ids[slot] is not None for slot in slots.tolist()], dtype=bool)
+            slots, scores = slots[live], scores[live]
+            best = top_k_smallest(-scores, top_k)
+            return [(self._doc_ids[slot], float(scores[i])) for i, slot in zip(best.tolist(), slots[best].tolist())]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]], limit: int | None = None, k: int = 60
+) -> List[Hashable]:
+    """Merge ranked lists by summing ``1 / (k + rank)`` for every item.
+
+    Items missing from a list simply get no contribution from it, so lexical
+    and semantic rankings with different score scales can be combined.  Ties
+    keep the order in which items were first seen.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(dict.fromkeys(ranking), start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    if limit is None:
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+    return heapq.nlargest(limit, scores, key=scores.__getitem__)
@@ -1,67 +1,109 @@
 """Chroma based vector store utilities."""
 
-from typing import Iterable, List, Tuple
 import os
+import threading
+from functools import lru_cache
+from typing import Callable, Sequence
 
-try:
-    import chromadb  # type: ignore
-    from chromadb.utils import embedding_functions  # type: ignore
-except Exception:  # pragma: no cover - optional dependency
-    chromadb = None  # type: ignore
-    embedding_functions = None  # type: ignore
+from ..embeddings.cache import CachedEmbeddingFunction, EmbeddingCache
+from ..embeddings.registry import EmbeddingModelRegistry
+from ..embeddings.server import EMBEDDING_SOCKET_ENV, EmbeddingClient
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .memory_store import InMemoryVectorStore
+from .retrieval_cache import RetrievalCache, normalize_query, retrieval_cache
+from .trigram_index import TrigramIndex
 
-try:
-    import torch  # type: ignore
-except Exception:  # pragma: no cover - optional dependency
-    torch = None  # type: ignore
 
+# chromadb and torch take seconds to import, so they are loaded on first use
+# rather than when the API or a script imports this module.
+@lru_cache(maxsize=None)
+def _chromadb():
+    """Return ``(chromadb, embedding_functions)`` or ``(None, None)`` if missing."""
+    try:
+        import chromadb  # type: ignore
+        from chromadb.utils import embedding_functions  # type: ignore
+    except Exception:  # pragma: no cover - optional dependency
+        return None, None
+    return chromadb, embedding_functions
 
-class ChromaStore:
-    """Simplified Chroma store maintaining vectors in memory."""
-
-    def __init__(self) -> None:
-        self._vectors: List[List[float]] = []
-        self._metadata: List[dict] = []
 
-    def add(self, embeddings: Iterable[List[float]], metadata: Iterable[dict]) -> None:
-        """Add embeddings along with metadata."""
-        for emb, meta in zip(embeddings, metadata):
-            self._vectors.append(list(emb))
-            self._metadata.append(dict(meta))
+@lru_cache(maxsize=None)
+def _torch():
+    try:
+        import torch  # type: ignore
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+    return torch
 
-    def _distance(self, a: List[float], b: List[float]) -> float:
-        return sum((x - y) ** 2 for x, y in zip(a, b))
 
-    def query(self, embedding: List[float], top_k: int = 5) -> List[Tuple[dict, float]]:
-        """Return closest metadata entries to the embedding."""
-        scored = [
-            (meta, self._distance(vec, embedding))
-            for vec, meta in zip(self._vectors, self._metadata)
-        ]
-        scored.sort(key=lambda x: x[1])
-        return scored[:top_k]
+class ChromaStore(InMemoryVectorStore):
+    """Simplified Chroma store maintaining vectors in memory."""
 
 
 class TenantVectorStore:
-    """Persistent vector store instance for a specific tenant."""
+    """Persistent vector store instance for a specific tenant.
+
+    :meth:`hybrid_query` results are cached in ``cache`` (the process-wide
+    :data:`~ai.vector_stores.retrieval_cache.retrieval_cache` by default)
+    under the tenant's collection version, which :meth:`add_documents`
+    bumps.
+    """
 
-    def __init__(self, tenant_id: str, persist_dir: str = "vector_store") -> None:
+    # hybrid_query fuses this many candidates per result from each ranking.
+    HYBRID_DEPTH = 2
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    # Documents embedded and written per collection.add call in add_documents.
+    ADD_BATCH_SIZE = 512
+    # Files rewritten by the loader scripts; see disk_signature.
+    DATA_FILES = ("chroma.sqlite3", "keyword_index.jsonl")
+
+    def __init__(
+        self,
+        tenant_id: str,
+        persist_dir: str = "vector_store",
+        cache: RetrievalCache | None = None,
+    ) -> None:
         self.tenant_id = tenant_id
         self.persist_path = os.path.join(persist_dir, tenant_id)
+        self.cache = cache if cache is not None else retrieval_cache
         os.makedirs(self.persist_path, exist_ok=True)
 
+        chromadb, embedding_functions = _chromadb()
         if chromadb is not None:
             self.client = chromadb.PersistentClient(path=self.persist_path)
 
-            device = "cuda" if torch and torch.cuda.is_available() else "cpu"
-            self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                device=device,
-            )
+            socket_path = os.environ.get(EMBEDDING_SOCKET_ENV)
+            if socket_path:
+                # A local embedding server owns the model for all workers.
+                key = ("embedding-server", socket_path)
+                factory = lambda: EmbeddingClient(socket_path)
+            else:
+                torch = _torch()
+                device = "cuda" if torch and torch.cuda.is_available() else "cpu"
+                key = ("sentence-transformers", self.EMBEDDING_MODEL, device)
+                factory = lambda: embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=self.EMBEDDING_MODEL,
+                    device=device,
+                )
+            # Loaded once per process and shared by every tenant's store;
+            # concurrent single-query calls are merged into one forward pass.
+            model = EmbeddingModelRegistry.batched(key, factory)
+            # Cache vectors under the model the server actually runs; the
+            # server is asked on the first embed call, not when opening.
+            if socket_path:
+                model_name = lambda: EmbeddingModelRegistry.get(key, factory).model
+            else:
+                model_name = self.EMBEDDING_MODEL
+            # Shared by all tenants under persist_dir, so a reloaded tenant
+            # only embeds new or changed rows.  Only documents go through
+            # it (see add_documents): every distinct question would add a
+            # row that is rarely read again.
+            cache = EmbeddingCache.shared(os.path.join(persist_dir, "embedding_cache.sqlite3"))
+            self.embedding_fn = CachedEmbeddingFunction(model, cache, model_name)
 
             self.collection = self.client.get_or_create_collection(
                 name="documents",
-                embedding_function=self.embedding_fn,
+                embedding_function=model,
             )
         else:  # pragma: no cover - fallback when chromadb is missing
             self.client = None
@@ -75,18 +117,138 @@ class TenantVectorStore:
                         self.docs.append(doc)
 
                 def query(self, query_texts, n_results=3):
-                    return {"documents": [self.docs[:n_results]]}
+                    return {"documents": [self.docs[:n_results] for _ in query_texts]}
 
                 def get(self, include=None):
                     return {"documents": list(self.docs)}
 
             self.collection = _DummyCollection()
 
+        # The fallback collection lives in memory only, and so does its index.
+        index_path = os.path.join(self.persist_path, "keyword_index.jsonl") if self.client else None
+        self.keyword_index = TrigramIndex(index_path)
+        if not self.keyword_index.exists:
+            self._rebuild_keyword_index()
+        # The trigram index holds the only in-memory copy of the texts: it
+        # answers keyword_search and resolves the ids BM25 ranks, and its
+        # log feeds BM25 incrementally (see _sync_bm25).
+        self.bm25 = BM25Index()
+        self._bm25_lock = threading.Lock()
+        self._bm25_generation = self.keyword_index.generation
+        self._bm25_position = 0
+        self._sync_bm25()
+        self._signature = self.disk_signature()
+
+    def disk_signature(self) -> tuple:
+        """Identify the tenant's files on disk (inode, mtime and size).
+
+        Ingestion runs in other processes (the loader scripts delete and
+        rebuild the tenant directory), so a change here means this handle
+        no longer reflects the data.
+        """
+        signature = []
+        try:
+            signature.append(os.stat(self.persist_path).st_ino)
+        except OSError:
+            signature.append(None)
+        for name in self.DATA_FILES:
+            try:
+                st = os.stat(os.path.join(self.persist_path, name))
+            except OSError:
+                signature.append(None)
+            else:
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def is_stale(self) -> bool:
+        """Return whether another process changed the tenant's files since this store opened."""
+        return self.disk_signature() != self._signature
+
+    def close(self) -> None:
+        """Release the Chroma client; the store must not be used afterwards.
+
+        The embedding cache is shared by every tenant under ``persist_dir``
+        and stays open.
+        """
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+    def _sync_bm25(self) -> None:
+        """Feed BM25 the documents the keyword index gained since the last call.
+
+        This includes rows appended to the keyword log by other processes.
+        """
+        with self._bm25_lock:
+            position, pairs = self.keyword_index.since(self._bm25_position)
+            if self.keyword_index.generation != self._bm25_generation:
+                # The log was replaced; start over from its contents.
+                self.bm25 = BM25Index()
+                self._bm25_generation = self.keyword_index.generation
+                position, pairs = self.keyword_index.since(0)
+            self._bm25_position = position
+            if pairs:
+                self.bm25.add_many(pairs)
+
+    def _rebuild_keyword_index(self) -> None:
+        """Index documents stored before the keyword index existed."""
+        try:
+            stored = self.collection.get(include=["documents"])
+        except Exception:
+            return
+        documents = stored.get("documents") or []
+        ids = stored.get("ids") or [str(i) for i in range(len(documents))]
+        self.keyword_index.add_many(zip(ids, documents))
+
     def add_document(self, doc_id: str, text: str, metadata: dict | None = None) -> None:
         """Add a single document to the tenant collection."""
-        if not metadata:
-            metadata = {"doc_id": doc_id}
-        self.collection.add(ids=[doc_id], documents=[text], metadatas=[metadata])
+        self.add_documents([doc_id], [text], [metadata])
+
+    def add_documents(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[dict | None] | None = None,
+        batch_size: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> None:
+        """Add many documents, ``batch_size`` per collection call.
+
+        Each call embeds its batch in one model pass (through the embedding
+        cache) and writes it in one Chroma transaction.  ``progress(done, total)`` is called after every
+        batch.
+        """
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        if not len(ids) == len(texts) == len(metadatas):
+            raise ValueError("ids, texts and metadatas must have the same length")
+        batch_size = batch_size or self.ADD_BATCH_SIZE
+        if self.client is not None and hasattr(self.client, "get_max_batch_size"):
+            batch_size = min(batch_size, self.client.get_max_batch_size())
+        total = len(ids)
+        for start in range(0, total, batch_size):
+            batch_ids = list(ids[start : start + batch_size])
+            batch_texts = list(texts[start : start + batch_size])
+            batch_meta = [
+                meta or {"doc_id": doc_id}
+                for doc_id, meta in zip(batch_ids, metadatas[start : start + batch_size])
+            ]
+            if self.client is not None:
+                self.collection.add(
+                    ids=batch_ids,
+                    documents=batch_texts,
+                    metadatas=batch_meta,
+                    embeddings=self.embedding_fn(batch_texts),
+                )
+            else:
+                self.collection.add(ids=batch_ids, documents=batch_texts, metadatas=batch_meta)
+            pairs = list(zip(batch_ids, batch_texts))
+            self.keyword_index.add_many(pairs)
+            self._sync_bm25()
+            self.cache.bump(self.persist_path)
+            # Our own writes do not make this handle stale.
+            self._signature = self.disk_signature()
+            if progress is not None:
+                progress(start + len(batch_ids), total)
 
     def query(self, text: str, n_results: int = 3) -> dict:
         """Query the collection for similar documents (Chroma format)."""
@@ -100,22 +262,67 @@ class TenantVectorStore:
         except Exception:
             return {"documents": [[]]}
 
-    def keyword_search(self, query: str) -> list[str]:
-        """Perform exact keyword match search on stored documents."""
+    def query_batch(self, texts: list[str], n_results: int = 3) -> dict:
+        """Query several texts with a single collection call (Chroma format).
+
+        Chroma embeds all ``query_texts`` in one forward pass.
+        """
         try:
-            all_docs = self.collection.get(include=["documents"]).get("documents", [])
+            results = self.collection.query(query_texts=list(texts), n_results=n_results)
+            documents = [list(docs) for docs in results.get("documents") or []]
         except Exception:
-            all_docs = getattr(self.collection, "docs", [])
-        query_lower = query.lower()
-        return [doc for doc in all_docs if query_lower in doc.lower()]
+            documents = []
+        documents += [[] for _ in range(len(texts) - len(documents))]
+        return {"documents": documents}
+
+    def keyword_search(self, query: str) -> list[str]:
+        """Perform exact keyword match search on stored documents.
+
+        Served by the tenant's trigram index, so only documents sharing every
+        trigram of ``query`` are checked.
+        """
+        return self.keyword_index.search(query)
+
+    def _fuse(self, query: str, semantic_docs: list[str], n_results: int) -> dict:
+        self._sync_bm25()
+        lexical_ids = [doc_id for doc_id, _ in self.bm25.search(query, n_results * self.HYBRID_DEPTH)]
+        lexical_docs = self.keyword_index.texts(lexical_ids)
+        return {"documents": [reciprocal_rank_fusion([lexical_docs, semantic_docs], limit=n_results)]}
 
     def hybrid_query(self, query: str, n_results: int = 3) -> dict:
-        """Combine semantic and keyword search results."""
-        keyword_results = self.keyword_search(query)
-        semantic_docs = self.query(query, n_results).get("documents", [[]])
+        """Combine semantic and BM25 keyword rankings with reciprocal rank fusion.
+
+        Each side contributes its best ``n_results * HYBRID_DEPTH`` documents.
+        Repeated queries (compared after :func:`normalize_query`) are served
+        from the cache until the collection changes.
+        """
+        key = (normalize_query(query), n_results)
+        cached = self.cache.get(self.persist_path, key)
+        if cached is not None:
+            return {"documents": [list(cached)]}
+        version = self.cache.version(self.persist_path)
+        semantic_docs = self.query(query, n_results * self.HYBRID_DEPTH).get("documents", [[]])
         if semantic_docs and isinstance(semantic_docs[0], list):
             semantic_docs = semantic_docs[0]
-        combined = list(dict.fromkeys(keyword_results + semantic_docs))
-        return {"documents": [combined[:n_results]]}
+        result = self._fuse(query, semantic_docs, n_results)
+        self.cache.put(self.persist_path, key, list(result["documents"][0]), version)
+        return result
+
+    def hybrid_query_batch(self, queries: list[str], n_results: int = 3) -> list[dict]:
+        """Run :meth:`hybrid_query` for many queries with one semantic lookup.
+
+        Only queries missing from the cache are sent to the collection.
+        """
+        keys = [(normalize_query(query), n_results) for query in queries]
+        cached = [self.cache.get(self.persist_path, key) for key in keys]
+        missing = [i for i, docs in enumerate(cached) if docs is None]
+        results = [{"documents": [list(docs)]} if docs is not None else None for docs in cached]
+        if missing:
+            version = self.cache.version(self.persist_path)
+            semantic = self.query_batch([queries[i] for i in missing], n_results * self.HYBRID_DEPTH)["documents"]
+            for i, docs in zip(missing, semantic):
+                results[i] = self._fuse(queries[i], docs, n_results)
+                self.cache.put(self.persist_path, keys[i], list(results[i]["documents"][0]), version)
+        return results
 
 
@@ -0,0 +1,39 @@
+"""k-means clustering helpers used by the approximate vector indexes."""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def assign(data: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Return the index of the nearest centroid for every row of ``data``."""
+    c_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(data.shape[0], dtype=np.int64)
+    for start in range(0, data.shape[0], chunk_size):
+        block = data[start : start + chunk_size]
+        # ||x||^2 is constant per row, so it does not affect the argmin.
+        dists = c_norms - 2.0 * (block @ centroids.T)
+        labels[start : start + chunk_size] = np.argmin(dists, axis=1)
+    return labels
+
+
+def kmeans(data: np.ndarray, k: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """Cluster ``data`` into ``k`` centroids with Lloyd's algorithm."""
+    data = np.asarray(data, dtype=np.float32)
+    n = data.shape[0]
+    if n == 0:
+        raise ValueError("Cannot run k-means on an empty dataset")
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(n, size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters with random points so every list is used.
+            centroids[empty] = data[rng.choice(n, size=int(empty.sum()), replace=False)]
+    return centroids
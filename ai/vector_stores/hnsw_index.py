@@ -0,0 +1,247 @@
+"""Hierarchical navigable small world (HNSW) graph index."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .matrix import VectorMatrix, check_metric, distances, distances_batch
+
+
+class HNSWIndex:
+    """Multi-layer proximity graph supporting incremental inserts.
+
+    Unlike :class:`~ai.vector_stores.ivf_index.IVFIndex` no training step is
+    needed: every new row is linked into the graph as it is added, so the
+    index keeps up with collections that grow throughout the day.  Like the
+    IVF index it stores row ids only and reads vectors from the owning
+    store's :class:`VectorMatrix`.
+    """
+
+    # Keyword arguments :meth:`search` accepts on top of the query.
+    SEARCH_PARAMS = ("ef_search",)
+
+    def __init__(
+        self,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 50,
+        seed: int = 0,
+        metric: str = "l2",
+    ) -> None:
+        self.M = M
+        self.metric = check_metric(metric)
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self._level_mult = 1.0 / math.log(max(M, 2))
+        self._rng = random.Random(seed)
+        self._layers: List[Dict[int, List[int]]] = []
+        self._levels: List[int] = []
+        self.entry_point: int | None = None
+        self.max_level = -1
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    # ------------------------------------------------------------------
+    # Graph search helpers
+    def _distances(self, matrix: VectorMatrix, query: np.ndarray, ids: List[int]) -> List[float]:
+        return distances(matrix.array[ids], matrix.sq_norms[ids], query, self.metric).tolist()
+
+    def _search_layer(
+        self,
+        matrix: VectorMatrix,
+        query: np.ndarray,
+        entry: List[int],
+        ef: int,
+        layer: int,
+    ) -> List[Tuple[float, int]]:
+        """Greedy beam search on one layer; returns ``(dist, id)`` ascending."""
+        adjacency = self._layers[layer]
+        visited = set(entry)
+        dists = self._distances(matrix, query, entry)
+        candidates = list(zip(dists, entry))
+        heapq.heapify(candidates)
+        results = [(-d, i) for d, i in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0]:
+                break
+            neighbours = [n for n in adjacency.get(node, ()) if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            for d, n in zip(self._distances(matrix, query, neighbours), neighbours):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-d, i) for d, i in results)
+
+    def _select_neighbours(
+        self, matrix: VectorMatrix, candidates: List[Tuple[float, int]], limit: int
+    ) -> List[int]:
+        """Pick diverse neighbours with the HNSW heuristic, then top up."""
+        if len(candidates) <= limit:
+            return [i for _, i in candidates]
+        ids = [i for _, i in candidates]
+        vecs = matrix.array[ids]
+        pairwise = distances_batch(vecs, vecs, matrix.sq_norms[ids], self.metric)
+        selected: List[int] = []
+        pruned: List[int] = []
+        for pos, (dist, _) in enumerate(candidates):
+            if len(selected) >= limit:
+                break
+            if all(dist < pairwise[pos, s] for s in selected):
+                selected.append(pos)
+            else:
+                pruned.append(pos)
+        for pos in pruned:
+            if len(selected) >= limit:
+                break
+            selected.append(pos)
+        return [ids[pos] for pos in selected]
+
+    def _shrink(self, matrix: VectorMatrix, node: int, layer: int, limit: int) -> None:
+        neighbours = self._layers[layer][node]
+        dists = self._distances(matrix, matrix.array[node], neighbours)
+        candidates = sorted(zip(dists, neighbours))
+        self._layers[layer][node] = self._select_neighbours(matrix, candidates, limit)
+
+    # ------------------------------------------------------------------
+    def _random_level(self) -> int:
+        return int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+
+    def _insert(self, matrix: VectorMatrix, node: int) -> None:
+        query = matrix.array[node]
+        level = self._random_level()
+        self._levels.append(level)
+        while len(self._layers) <= level:
+            self._layers.append({})
+        for layer in range(level + 1):
+            self._layers[layer][node] = []
+
+        if self.entry_point is None:
+            self.entry_point = node
+            self.max_level = level
+            return
+
+        entry = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            entry = [self._search_layer(matrix, query, entry, 1, layer)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(matrix, query, entry, self.ef_construction, layer)
+            neighbours = self._select_neighbours(matrix, found, self.M)
+            self._layers[layer][node] = neighbours
+            limit = self.M0 if layer == 0 else self.M
+            for n in neighbours:
+                links = self._layers[layer][n]
+                links.append(node)
+                if len(links) > limit:
+                    self._shrink(matrix, n, layer, limit)
+            entry = [i for _, i in found]
+
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+
+    def add(self, matrix: VectorMatrix) -> None:
+        """Link every row of ``matrix`` not yet in the graph."""
+        for node in range(len(self._levels), len(matrix)):
+            self._insert(matrix, node)
+
+    def search(
+        self,
+        matrix: VectorMatrix,
+        query: np.ndarray,
+        top_k: int,
+        ef_search: int | None = None,
+        allowed: np.ndarray | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(row_ids, distances)`` of the approximate top_k.
+
+        With an ``allowed`` row mask the beam is widened in proportion to the
+        filter's selectivity and non-matching rows are dropped, so fewer than
+        ``top_k`` rows may come back for very selective filters.
+        """
+        if self.entry_point is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ef = max(ef_search or self.ef_search, top_k)
+        if allowed is not None:
+            matching = max(int(allowed[: len(self)].sum()), 1)
+            ef = min(max(ef, top_k * len(self) // matching), len(self))
+        entry = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            entry = [self._search_layer(matrix, query, entry, 1, layer)[0][1]]
+        found = self._search_layer(matrix, query, entry, ef, 0)
+        if allowed is not None:
+            found = [(d, i) for d, i in found if allowed[i]]
+        found = found[:top_k]
+        ids = np.array([i for _, i in found], dtype=np.int64)
+        dists = np.array([d for d, _ in found], dtype=np.float32)
+        return ids, dists
+
+    # ------------------------------------------------------------------
+    # Serialization
+    def save(self, path: str | Path) -> None:
+        """Write the graph (not the vectors) to an ``.npz`` file."""
+        arrays = {
+            "params": np.array(
+                [self.M, self.ef_construction, self.ef_search, self.seed], dtype=np.int64
+            ),
+            "metric": np.array(self.metric),
+            "levels": np.array(self._levels, dtype=np.int64),
+            "entry": np.array(
+                [-1 if self.entry_point is None else self.entry_point, self.max_level],
+                dtype=np.int64,
+            ),
+        }
+        for layer, adjacency in enumerate(self._layers):
+            nodes = sorted(adjacency)
+            offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(adjacency[n]) for n in nodes])
+            links = [n for node in nodes for n in adjacency[node]]
+            arrays[f"nodes_{layer}"] = np.array(nodes, dtype=np.int64)
+            arrays[f"offsets_{layer}"] = offsets
+            arrays[f"links_{layer}"] = np.array(links, dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "HNSWIndex":
+        """Restore a graph written by :meth:`save`."""
+        with np.load(path) as data:
+            M, ef_construction, ef_search, seed = data["params"].tolist()
+            metric = str(data["metric"]) if "metric" in data.files else "l2"
+            index = cls(M=M, ef_construction=ef_construction, ef_search=ef_search, seed=seed, metric=metric)
+            index._levels = data["levels"].tolist()
+            entry, index.max_level = data["entry"].tolist()
+            index.entry_point = None if entry < 0 else entry
+            for layer in range(index.max_level + 1):
+                nodes = data[f"nodes_{layer}"].tolist()
+                offsets = data[f"offsets_{layer}"].tolist()
+                links = data[f"links_{layer}"].tolist()
+                index._layers.append(
+                    {n: links[offsets[k] : offsets[k + 1]] for k, n in enumerate(nodes)}
+                )
+        # Replay the level draws so later inserts continue the same sequence.
+        for _ in range(len(index._levels)):
+            index._random_level()
+        return index
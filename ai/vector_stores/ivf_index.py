@@ -0,0 +1,128 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .clustering import assign, kmeans
+from .matrix import VectorMatrix, check_metric, distances, top_k_smallest
+
+
+class IVFIndex:
+    """Partition vectors into ``nlist`` k-means cells and scan only a few.
+
+    The index stores row ids only; vectors stay in the owning store's
+    :class:`VectorMatrix`.  At query time the ``nprobe`` cells whose
+    centroids are closest to the query are scanned exactly, trading recall
+    for latency.
+    """
+
+    # Keyword arguments :meth:`search` accepts on top of the query.
+    SEARCH_PARAMS = ("nprobe",)
+
+    def __init__(
+        self,
+        nlist: int = 100,
+        nprobe: int = 8,
+        n_iter: int = 20,
+        seed: int = 0,
+        metric: str = "l2",
+    ) -> None:
+        self.nlist = nlist
+        self.metric = check_metric(metric)
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids: np.ndarray | None = None
+        self._lists: List[List[int]] = []
+        self._arrays: List[np.ndarray | None] = []
+        self._indexed = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, max_samples: int | None = None) -> None:
+        """Learn coarse centroids from a sample of ``vectors``."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        max_samples = max_samples or self.nlist * 256
+        if vectors.shape[0] > max_samples:
+            rng = np.random.default_rng(self.seed)
+            vectors = vectors[rng.choice(vectors.shape[0], size=max_samples, replace=False)]
+        self.set_centroids(kmeans(vectors, self.nlist, n_iter=self.n_iter, seed=self.seed))
+
+    def set_centroids(self, centroids: np.ndarray) -> None:
+        """Use already trained ``centroids`` and empty every inverted list."""
+        self.centroids = centroids
+        self._lists = [[] for _ in range(centroids.shape[0])]
+        self._arrays = [None] * len(self._lists)
+        self._indexed = 0
+
+    def add(self, matrix: VectorMatrix) -> None:
+        """Assign every row of ``matrix`` not yet indexed to its cell."""
+        if not self.is_trained or self._indexed >= len(matrix):
+            return
+        start = self._indexed
+        labels = assign(matrix.array[start:], self.centroids)
+        for offset, label in enumerate(labels.tolist()):
+            self._lists[label].append(start + offset)
+            self._arrays[label] = None
+        self._indexed = len(matrix)
+
+    def _list_array(self, cell: int) -> np.ndarray:
+        arr = self._arrays[cell]
+        if arr is None:
+            arr = np.fromiter(self._lists[cell], dtype=np.int64, count=len(self._lists[cell]))
+            self._arrays[cell] = arr
+        return arr
+
+    def probe(self, query: np.ndarray, nprobe: int | None = None) -> np.ndarray:
+        """Return the row ids stored in the ``nprobe`` cells nearest ``query``."""
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        # Cells are k-means (L2) clusters; only inner product ranks them by dot.
+        probe_metric = "ip" if self.metric == "ip" else "l2"
+        c_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        cells = top_k_smallest(distances(self.centroids, c_norms, query, probe_metric), nprobe)
+        return np.concatenate([self._list_array(c) for c in cells.tolist()])
+
+    def search(
+        self,
+        matrix: VectorMatrix,
+        query: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        allowed: np.ndarray | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(row_ids, distances)`` of the approximate top_k.
+
+        ``allowed`` is an optional boolean row mask; other rows are skipped.
+        """
+        ids = self.probe(query, nprobe)
+        if allowed is not None:
+            ids = ids[allowed[ids]]
+        if ids.size == 0:
+            return ids, np.empty(0, dtype=np.float32)
+        dists = distances(matrix.array[ids], matrix.sq_norms[ids], query, self.metric)
+        order = top_k_smallest(dists, top_k)
+        return ids[order], dists[order]
+
+
+def recall_at_k(approx: Iterable[Iterable[int]], exact: Iterable[Iterable[int]]) -> float:
+    """Return the mean fraction of exact neighbours found by the approximate search."""
+    hits = 0
+    total = 0
+    for found, truth in zip(approx, exact):
+        truth = set(truth)
+        hits += len(truth.intersection(found))
+        total += len(truth)
+    return hits / total if total else 1.0
+
+
+def format_recall_report(report: Dict[int, float], top_k: int) -> str:
+    """Render a ``{nprobe: recall}`` mapping as a small text table."""
+    lines = [f"nprobe  recall@{top_k}"]
+    for nprobe, recall in sorted(report.items()):
+        lines.append(f"{nprobe:>6}  {recall:.3f}")
+    return "\n".join(lines)
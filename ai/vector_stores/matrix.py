@@ -0,0 +1,203 @@
+"""Contiguous vector storage shared by the in-memory vector stores."""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+import numpy as np
+
+# Distance metrics understood by the stores and indexes.  Smaller is closer
+# for all of them: ``l2`` is the squared Euclidean distance, ``cosine`` is
+# ``1 - cos`` over vectors normalized at insert time, ``ip`` is ``-dot``.
+METRICS = ("l2", "cosine", "ip")
+
+
+def check_metric(metric: str) -> str:
+    if metric not in METRICS:
+        raise ValueError(f"Unsupported metric: {metric}")
+    return metric
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Return ``vectors`` scaled to unit L2 norm (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def dots_to_distances(dots: np.ndarray, sq_norms: np.ndarray, query_sq_norm: float, metric: str = "l2") -> np.ndarray:
+    """Turn row-query dot products into distances under ``metric`` (in place)."""
+    if metric == "ip":
+        return np.negative(dots, out=dots)
+    if metric == "cosine":
+        return np.subtract(1.0, dots, out=dots)
+    dots *= -2.0
+    dots += sq_norms
+    dots += query_sq_norm
+    return np.maximum(dots, 0.0, out=dots)
+
+
+def distances(rows: np.ndarray, sq_norms: np.ndarray, query: np.ndarray, metric: str = "l2") -> np.ndarray:
+    """Return the distance from ``query`` to every row under ``metric``."""
+    return dots_to_distances(rows @ query, sq_norms, float(query @ query), metric)
+
+
+def distances_batch(
+    queries: np.ndarray, rows: np.ndarray, sq_norms: np.ndarray, metric: str = "l2"
+) -> np.ndarray:
+    """Return a ``(queries, rows)`` distance matrix from one matrix product."""
+    dots = queries @ rows.T
+    if metric == "ip":
+        return np.negative(dots, out=dots)
+    if metric == "cosine":
+        return np.subtract(1.0, dots, out=dots)
+    dots *= -2.0
+    dots += sq_norms[None, :]
+    dots += np.einsum("ij,ij->i", queries, queries)[:, None]
+    return np.maximum(dots, 0.0, out=dots)
+
+
+class VectorMatrix:
+    """Growable row-major matrix with amortized O(1) appends.
+
+    Rows live in a single preallocated buffer whose capacity doubles whenever
+    it fills up, so appending ``n`` vectors costs ``O(n)`` overall and every
+    query can score the whole matrix with one vectorized call.  Squared row
+    norms are cached alongside the rows to make L2 scoring a single matrix
+    product.
+
+    With ``on_disk=True`` the buffer is a memory-mapped file (``path`` or an
+    anonymous temporary file) so only the pages actually touched stay
+    resident.
+    """
+
+    def __init__(
+        self,
+        dim: int | None = None,
+        capacity: int = 1024,
+        dtype: np.dtype = np.float32,
+        norms: bool = True,
+        on_disk: bool = False,
+        path: str | Path | None = None,
+    ) -> None:
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._capacity = max(1, capacity)
+        self._size = 0
+        self._track_norms = norms
+        self._file: BinaryIO | None = None
+        if on_disk or path is not None:
+            self._file = open(path, "w+b") if path is not None else tempfile.TemporaryFile()
+        self._data = np.empty((0, dim or 0), dtype=self.dtype)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, sq_norms: np.ndarray | None = None) -> "VectorMatrix":
+        """Wrap an existing (possibly memory-mapped) 2-D array without copying.
+
+        The array is treated as read-only: the first append copies it into a
+        new in-memory buffer.  An empty array leaves the dimension unset, so
+        it is taken from the first append.
+        """
+        if array.shape[0] == 0:
+            return cls()
+        matrix = cls(dim=array.shape[1])
+        matrix._data = array
+        matrix._size = array.shape[0]
+        if sq_norms is None:
+            sq_norms = np.einsum("ij,ij->i", array, array)
+        matrix._sq_norms = sq_norms
+        return matrix
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def array(self) -> np.ndarray:
+        """Return a view of the populated rows (no copy)."""
+        return self._data[: self._size]
+
+    @property
+    def sq_norms(self) -> np.ndarray:
+        """Return a view of the cached squared L2 norm of every row."""
+        return self._sq_norms[: self._size]
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        if self._file is None:
+            data = np.empty((capacity, self.dim), dtype=self.dtype)
+            data[: self._size] = self._data[: self._size]
+            return data
+        # Growing the file keeps existing rows in place, so nothing is copied.
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+        self._file.truncate(capacity * self.dim * self.dtype.itemsize)
+        return np.memmap(self._file, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, needed: int) -> None:
+        if needed <= self._data.shape[0]:
+            return
+        capacity = max(self._capacity, self._data.shape[0])
+        while capacity < needed:
+            capacity *= 2
+        self._data = self._allocate(capacity)
+        if self._track_norms:
+            norms = np.empty(capacity, dtype=np.float32)
+            norms[: self._size] = self._sq_norms[: self._size]
+            self._sq_norms = norms
+
+    def append(self, rows: Iterable) -> None:
+        """Append one vector or a 2-D block of vectors."""
+        block = np.asarray(rows, dtype=self.dtype)
+        if block.ndim == 1:
+            block = block.reshape(1, -1)
+        if block.shape[0] == 0:
+            return
+        if self.dim is None:
+            self.dim = block.shape[1]
+            self._data = np.empty((0, self.dim), dtype=self.dtype)
+        elif block.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dim}, got {block.shape[1]}"
+            )
+        end = self._size + block.shape[0]
+        self._reserve(end)
+        self._data[self._size : end] = block
+        if self._track_norms:
+            self._sq_norms[self._size : end] = np.einsum("ij,ij->i", block, block)
+        self._size = end
+
+    @property
+    def nbytes(self) -> int:
+        """Return the resident size of the populated rows and norms."""
+        resident = 0 if self._file is not None else self._size * (self.dim or 0) * self.dtype.itemsize
+        return resident + (self._size * 4 if self._track_norms else 0)
+
+
+def top_k_smallest(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the ``k`` smallest scores in ascending order.
+
+    Uses ``argpartition`` so only the selected candidates are sorted.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(scores, kind="stable")
+    candidates = np.argpartition(scores, k - 1)[:k]
+    return candidates[np.argsort(scores[candidates], kind="stable")]
+
+
+def top_k_smallest_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise :func:`top_k_smallest` for a 2-D ``(queries, rows)`` matrix."""
+    n_queries, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((n_queries, 0), dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n), (n_queries, 1))
+    order = np.argsort(np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
@@ -0,0 +1,602 @@
+"""Shared implementation of the in-memory vector stores."""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .hnsw_index import HNSWIndex
+from .ivf_index import IVFIndex, recall_at_k
+from .locks import ReadWriteLock
+from .matrix import (
+    VectorMatrix,
+    check_metric,
+    distances,
+    distances_batch,
+    normalize_rows,
+    top_k_smallest,
+    top_k_smallest_rows,
+)
+from .metadata_index import MetadataIndex
+from .persistence import read_store, write_store
+from .quantization import ProductQuantizer, ScalarQuantizer
+
+
+class InMemoryVectorStore:
+    """Keep vectors in a contiguous float32 matrix with an optional ANN index.
+
+    With the default ``"flat"`` index every query is an exact scan.  Other
+    index types (see :attr:`INDEX_TYPES`) are built from ``index_params`` and
+    take over once trained; until then queries fall back to the exact scan.
+
+    ``quantization`` (see :attr:`QUANTIZERS`) opts into compact storage: the
+    flat scan runs over in-memory ``uint8`` codes, the full-precision vectors
+    move to a memory-mapped file (``vector_path`` or a temporary file) and
+    the best ``top_k * rerank`` candidates are re-ranked exactly.
+
+    Metadata fields (all of them, or only ``metadata_fields``) are indexed
+    as rows are added so ``query(..., where={...})`` scores matching rows
+    only; see :class:`~ai.vector_stores.metadata_index.MetadataIndex`.
+
+    Rows may carry document ids.  :meth:`upsert` replaces rows by id and
+    :meth:`delete` tombstones them; tombstoned rows are skipped by queries
+    and reclaimed by :meth:`compact`, which starts in a background thread
+    once ``compaction_threshold`` of all rows are dead.  Queries share a
+    read lock, so they keep running while a compaction rebuilds the rows.
+
+    ``metric`` selects ``"l2"`` (squared Euclidean), ``"cosine"`` or ``"ip"``
+    (inner product).  Cosine stores normalize vectors and queries up front,
+    so scoring is a plain dot product; returned scores are ``1 - cos``.
+    Inner-product scores are ``-dot`` so smaller is closer for all metrics.
+    """
+
+    INDEX_TYPES = {
+        "flat": None,
+        "ivf": IVFIndex,
+        "hnsw": HNSWIndex,
+    }
+
+    QUANTIZERS = {
+        "sq8": ScalarQuantizer,
+        "pq": ProductQuantizer,
+    }
+
+    TRAIN_SAMPLE_SIZE = 65536
+    # Upper bound on query x row distances materialized by one batch step.
+    BATCH_SCORE_LIMIT = 1 << 24
+    # Filters matching at most this fraction of rows are scanned exactly.
+    FILTER_SCAN_FRACTION = 0.05
+
+    # Attributes replaced wholesale when a compaction finishes.
+    _ROW_STATE = (
+        "_vectors",
+        "_codes",
+        "_metadata",
+        "_metadata_index",
+        "_index",
+        "_ids",
+        "_id_rows",
+        "_id_rows_upto",
+        "_deleted",
+        "_live",
+    )
+
+    def __init__(
+        self,
+        index: str = "flat",
+        quantization: str | None = None,
+        quantization_params: dict | None = None,
+        rerank: int = 4,
+        vector_path: str | None = None,
+        metadata_fields: Iterable[str] | None = None,
+        compaction_threshold: float | None = 0.2,
+        metric: str = "l2",
+        **index_params: Any,
+    ) -> None:
+        check_metric(metric)
+        if index not in self.INDEX_TYPES:
+            raise ValueError(f"Unsupported index: {index}")
+        if quantization is not None and quantization not in self.QUANTIZERS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self._config = dict(
+            index=index,
+            quantization=quantization,
+            quantization_params=quantization_params,
+            rerank=rerank,
+            vector_path=vector_path,
+            metadata_fields=metadata_fields,
+            metric=metric,
+            **index_params,
+        )
+        index_cls = self.INDEX_TYPES[index]
+        self.index_type = index
+        self.metric = metric
+        self._index = index_cls(metric=metric, **index_params) if index_cls else None
+        self.rerank = rerank
+        self.compaction_threshold = compaction_threshold
+        self._quantizer = None
+        self._codes: VectorMatrix | None = None
+        if quantization is not None:
+            self._quantizer = self.QUANTIZERS[quantization](metric=metric, **(quantization_params or {}))
+            self._codes = VectorMatrix(dtype=self._quantizer.code_dtype, norms=False)
+            self._vectors = VectorMatrix(on_disk=True, path=vector_path)
+        else:
+            self._vectors = VectorMatrix()
+        self._metadata: List[dict] = []
+        self._metadata_index = MetadataIndex(metadata_fields)
+        self._ids: List[Any] = []
+        self._id_rows: Dict[Any, int] = {}
+        self._id_rows_upto = 0
+        self._deleted: set[int] = set()
+        self._live: np.ndarray | None = None
+        self._lock = ReadWriteLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._metadata) - len(self._deleted)
+
+    # ------------------------------------------------------------------
+    # Writes
+    def add(
+        self,
+        embeddings: Iterable[List[float]],
+        metadata: Iterable[dict],
+        ids: Iterable[Any] | None = None,
+    ) -> None:
+        """Add embeddings with associated metadata.
+
+        Rows whose id is already stored replace (tombstone) the old row.
+        """
+        if not isinstance(embeddings, np.ndarray):
+            embeddings = list(embeddings)
+        metadata = [dict(meta) for meta in metadata]
+        ids = list(ids) if ids is not None else None
+        count = min(len(embeddings), len(metadata))
+        if ids is not None:
+            count = min(count, len(ids))
+        if count == 0:
+            return
+        with self._lock.write():
+            self._append(embeddings[:count], metadata[:count], ids[:count] if ids is not None else None)
+        self._maybe_compact()
+
+    def upsert(self, ids: Iterable[Any], embeddings: Iterable[List[float]], metadata: Iterable[dict]) -> None:
+        """Insert new rows or replace existing ones by document id."""
+        self.add(embeddings, metadata, ids=ids)
+
+    def delete(self, ids: Iterable[Any]) -> int:
+        """Tombstone the rows stored under ``ids``; return how many were found."""
+        with self._lock.write():
+            removed = self._delete_ids(ids)
+        self._maybe_compact()
+        return removed
+
+    def _append(self, embeddings: Any, metadata: List[dict], ids: List[Any] | None) -> None:
+        if ids is None:
+            ids = [None] * len(metadata)
+        id_rows = self._id_map()
+        start = len(self._metadata)
+        self._vectors.append(self._prepare(embeddings))
+        self._metadata.extend(metadata)
+        self._ids.extend(ids)
+        for offset, doc_id in enumerate(ids):
+            if doc_id is None:
+                continue
+            previous = id_rows.get(doc_id)
+            if previous is not None:
+                self._tombstone(previous)
+            id_rows[doc_id] = start + offset
+        self._id_rows_upto = len(self._ids)
+        self._metadata_index.update(self._metadata)
+        self._update_indexes()
+        self._live = None
+
+    def _prepare(self, vectors: Any) -> np.ndarray:
+        """Return ``vectors`` as float32, unit-normalized for cosine stores."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return normalize_rows(vectors) if self.metric == "cosine" else vectors
+
+    def _id_map(self) -> Dict[Any, int]:
+        """Return the id -> row map, indexing rows loaded from disk lazily."""
+        for row in range(self._id_rows_upto, len(self._ids)):
+            doc_id = self._ids[row]
+            if doc_id is not None and row not in self._deleted:
+                self._id_rows[doc_id] = row
+        self._id_rows_upto = len(self._ids)
+        return self._id_rows
+
+    def _tombstone(self, row: int) -> None:
+        self._deleted.add(row)
+        self._live = None
+
+    def _delete_ids(self, ids: Iterable[Any]) -> int:
+        id_rows = self._id_map()
+        removed = 0
+        for doc_id in ids:
+            row = id_rows.pop(doc_id, None)
+            if row is not None:
+                self._tombstone(row)
+                removed += 1
+        return removed
+
+    def _update_indexes(self) -> None:
+        """Bring the ANN index and quantized codes up to date with the matrix."""
+        if self._index is not None:
+            self._index.add(self._vectors)
+        if self._quantizer is not None and self._quantizer.is_trained:
+            for start in range(len(self._codes), len(self._vectors), self.TRAIN_SAMPLE_SIZE):
+                block = self._vectors.array[start : start + self.TRAIN_SAMPLE_SIZE]
+                self._codes.append(self._quantizer.encode(block))
+
+    def train(self, embeddings: Iterable[List[float]] | None = None) -> None:
+        """Train the index and quantizer on ``embeddings`` (default: stored vectors)."""
+        with self._lock.write():
+            if embeddings is None:
+                sample = self._vectors.array
+                if len(sample) > self.TRAIN_SAMPLE_SIZE:
+                    rng = np.random.default_rng(0)
+                    sample = sample[np.sort(rng.choice(len(sample), self.TRAIN_SAMPLE_SIZE, replace=False))]
+            else:
+                if not isinstance(embeddings, np.ndarray):
+                    embeddings = list(embeddings)
+                sample = self._prepare(embeddings)
+            if self._index is not None and hasattr(self._index, "train"):
+                self._index.train(sample)
+            if self._quantizer is not None:
+                self._quantizer.train(sample)
+                self._codes = VectorMatrix(dtype=self._quantizer.code_dtype, norms=False)
+            self._update_indexes()
+
+    # ------------------------------------------------------------------
+    # Compaction
+    @property
+    def compaction_running(self) -> bool:
+        thread = self._compaction_thread
+        return thread is not None and thread.is_alive()
+
+    def _maybe_compact(self) -> None:
+        if (
+            self.compaction_threshold is not None
+            and self._deleted
+            and len(self._deleted) >= self.compaction_threshold * len(self._metadata)
+            and not self.compaction_running
+        ):
+            self.compact(background=True)
+
+    def compact(self, background: bool = False) -> threading.Thread | None:
+        """Drop tombstoned rows and rebuild the indexes without them.
+
+        The rebuild runs outside the write lock so queries (and writes) keep
+        going; writes made meanwhile are replayed before the new rows are
+        swapped in.  With ``background=True`` the work runs in a daemon
+        thread, which is returned.
+        """
+        if not background:
+            self._compact()
+            return None
+        thread = threading.Thread(target=self._compact, name="vector-store-compaction", daemon=True)
+        self._compaction_thread = thread
+        thread.start()
+        return thread
+
+    def _empty_like(self) -> "InMemoryVectorStore":
+        """Return an empty store sharing this store's trained structures."""
+        config = dict(self._config, compaction_threshold=None)
+        if config["vector_path"]:
+            config["vector_path"] = f"{config['vector_path']}.compact"
+        fresh = self.__class__(**config)
+        if self._quantizer is not None and self._quantizer.is_trained:
+            fresh._quantizer = self._quantizer
+        if isinstance(self._index, IVFIndex) and self._index.is_trained:
+            fresh._index.set_centroids(self._index.centroids)
+        return fresh
+
+    def _compact(self) -> None:
+        with self._compaction_lock:
+            with self._lock.read():
+                if not self._deleted:
+                    return
+                size = len(self._metadata)
+                dead = set(self._deleted)
+                live = np.flatnonzero(self._live_mask()).tolist()
+                vectors = self._vectors.array[live]
+                metadata = [self._metadata[i] for i in live]
+                ids = [self._ids[i] for i in live]
+
+            fresh = self._empty_like()
+            fresh._append(vectors, metadata, ids)
+
+            with self._lock.write():
+                # Replay deletes and appends that landed during the rebuild.
+                fresh._delete_ids(self._ids[row] for row in self._deleted - dead if row < size)
+                tail = [row for row in range(size, len(self._metadata)) if row not in self._deleted]
+                if tail:
+                    fresh._append(
+                        self._vectors.array[tail],
+                        [self._metadata[row] for row in tail],
+                        [self._ids[row] for row in tail],
+                    )
+                for name in self._ROW_STATE:
+                    setattr(self, name, getattr(fresh, name))
+                if self._config["vector_path"]:
+                    os.replace(fresh._config["vector_path"], self._config["vector_path"])
+
+    # ------------------------------------------------------------------
+    # Queries
+    @property
+    def memory_usage(self) -> int:
+        """Return the approximate resident bytes used by vectors and codes."""
+        codes = self._codes.nbytes if self._codes is not None else 0
+        return self._vectors.nbytes + codes
+
+    def _live_mask(self) -> np.ndarray | None:
+        """Return a mask of non-deleted rows (``None`` when nothing is deleted)."""
+        if not self._deleted:
+            return None
+        live = self._live
+        if live is None or live.size != len(self._metadata):
+            live = np.ones(len(self._metadata), dtype=bool)
+            live[list(self._deleted)] = False
+            self._live = live
+        return live
+
+    def _allowed(self, where: dict | None) -> np.ndarray | None:
+        """Return the mask of rows a query may return (``None`` = all rows)."""
+        live = self._live_mask()
+        if not where:
+            return live
+        # Stores opened with load() index their metadata on first use.
+        self._metadata_index.update(self._metadata)
+        mask = self._metadata_index.mask(where, len(self._metadata))
+        return mask if live is None else mask & live
+
+    def _exact_search(
+        self, query: np.ndarray, top_k: int, allowed: np.ndarray | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(row_ids, distances)`` from a full scan."""
+        dists = distances(self._vectors.array, self._vectors.sq_norms, query, self.metric)
+        if allowed is not None:
+            dists[~allowed] = np.inf
+        order = top_k_smallest(dists, top_k)
+        if allowed is not None:
+            order = order[np.isfinite(dists[order])]
+        return order, dists[order]
+
+    def _subset_search(self, query: np.ndarray, ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact scan restricted to the rows in ``ids``."""
+        dists = distances(self._vectors.array[ids], self._vectors.sq_norms[ids], query, self.metric)
+        order = top_k_smallest(dists, top_k)
+        return ids[order], dists[order]
+
+    def _exact_search_batch(
+        self, queries: np.ndarray, top_k: int, allowed: np.ndarray | None = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Full scan for many queries, one matrix product per chunk.
+
+        Selective ``allowed`` masks are scanned as a row subset; broad ones
+        (e.g. a few tombstones) mask the distances instead of copying rows.
+        """
+        ids = None
+        vectors, norms = self._vectors.array, self._vectors.sq_norms
+        if allowed is not None:
+            selected = np.flatnonzero(allowed)
+            if selected.size <= self.FILTER_SCAN_FRACTION * allowed.size:
+                ids, allowed = selected, None
+                vectors, norms = vectors[ids], norms[ids]
+        step = max(1, self.BATCH_SCORE_LIMIT // max(len(vectors), 1))
+        results: List[Tuple[np.ndarray, np.ndarray]] = []
+        for start in range(0, len(queries), step):
+            block = queries[start : start + step]
+            dists = distances_batch(block, vectors, norms, self.metric)
+            if allowed is not None:
+                dists[:, ~allowed] = np.inf
+            local = top_k_smallest_rows(dists, top_k)
+            found = local if ids is None else ids[local]
+            for row_ids, row_dists in zip(found, np.take_along_axis(dists, local, axis=1)):
+                keep = np.isfinite(row_dists)
+                results.append((row_ids[keep], row_dists[keep]))
+        return results
+
+    def _quantized_search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        rerank: int | None = None,
+        allowed: np.ndarray | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scan the codes, then re-rank the short list at full precision."""
+        approx = self._quantizer.distances(self._codes.array, query)
+        if allowed is not None:
+            approx[~allowed] = np.inf
+        shortlist = top_k * max(rerank or self.rerank, 1)
+        # Sorted row ids keep the reads from the on-disk matrix sequential.
+        candidates = np.sort(top_k_smallest(approx, shortlist))
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        dists = distances(self._vectors.array[candidates], self._vectors.sq_norms[candidates], query, self.metric)
+        order = top_k_smallest(dists, top_k)
+        return candidates[order], dists[order]
+
+    def _uses_exact_scan(self) -> bool:
+        index_ready = self._index is not None and self._index.is_trained
+        quantizer_ready = self._quantizer is not None and self._quantizer.is_trained
+        return not (index_ready or quantizer_ready)
+
+    def _search_params(self) -> Tuple[str, ...]:
+        """Return the search parameters :meth:`_search` forwards on the active path."""
+        if self._index is not None and self._index.is_trained:
+            return self._index.SEARCH_PARAMS
+        if self._quantizer is not None and self._quantizer.is_trained:
+            return ("rerank",)
+        return ()
+
+    def _search(
+        self,
+        embedding: List[float],
+        top_k: int,
+        allowed: np.ndarray | None = None,
+        **search_params: Any,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        query = self._prepare(embedding)
+        if allowed is not None:
+            ids = np.flatnonzero(allowed)
+            if ids.size <= max(top_k, self.FILTER_SCAN_FRACTION * allowed.size):
+                return self._subset_search(query, ids, top_k)
+        if self._index is not None and self._index.is_trained:
+            found = self._index.search(self._vectors, query, top_k, allowed=allowed, **search_params)
+            if allowed is not None and found[0].size < top_k:
+                return self._subset_search(query, ids, top_k)
+            return found
+        if self._quantizer is not None and self._quantizer.is_trained:
+            return self._quantized_search(query, top_k, allowed=allowed, **search_params)
+        return self._exact_search(query, top_k, allowed)
+
+    def _rows(self, ids: np.ndarray, dists: np.ndarray) -> List[Tuple[dict, float]]:
+        return [(self._metadata[i], float(d)) for i, d in zip(ids.tolist(), dists.tolist())]
+
+    def query(
+        self,
+        embedding: List[float],
+        top_k: int = 5,
+        where: dict | None = None,
+        **search_params: Any,
+    ) -> List[Tuple[dict, float]]:
+        """Return top_k metadata items ranked by distance.
+
+        ``where`` restricts the search to rows whose metadata matches it.
+        ``search_params`` are forwarded to the index, e.g. ``nprobe`` for IVF
+        or ``ef_search`` for HNSW, or ``rerank`` for quantized storage.
+        """
+        with self._lock.read():
+            if not self._metadata:
+                return []
+            ids, dists = self._search(embedding, top_k, allowed=self._allowed(where), **search_params)
+            return self._rows(ids, dists)
+
+    def query_batch(
+        self,
+        embeddings: Iterable[List[float]],
+        top_k: int = 5,
+        where: dict | None = None,
+        **search_params: Any,
+    ) -> List[List[Tuple[dict, float]]]:
+        """Run :meth:`query` for many embeddings at once.
+
+        Exact scans score the whole batch with one matrix product (chunked to
+        bound memory); index and quantized searches run per query.
+        """
+        if not isinstance(embeddings, np.ndarray):
+            embeddings = list(embeddings)
+        if len(embeddings) == 0:
+            return []
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        queries = self._prepare(queries)
+        with self._lock.read():
+            if not self._metadata:
+                return [[] for _ in range(len(queries))]
+            allowed = self._allowed(where)
+            if self._uses_exact_scan():
+                found = self._exact_search_batch(queries, top_k, allowed)
+            else:
+                found = [self._search(q, top_k, allowed=allowed, **search_params) for q in queries]
+            return [self._rows(ids, dists) for ids, dists in found]
+
+    def recall_report(
+        self,
+        queries: Sequence[List[float]],
+        top_k: int = 10,
+        param: str = "nprobe",
+        values: Sequence[int] = (1, 2, 4, 8, 16),
+    ) -> Dict[int, float]:
+        """Measure recall@top_k of the index against the exact scan.
+
+        Returns a mapping from each tried ``param`` value to its recall so the
+        cheapest setting meeting a recall target can be picked per tenant.
+        Raises :class:`ValueError` if the active index or quantizer does not
+        take ``param``.
+        """
+        queries = self._prepare(queries)
+        with self._lock.read():
+            accepted = self._search_params()
+            if param not in accepted:
+                raise ValueError(
+                    f"Search parameter {param!r} is not accepted here; expected one of {list(accepted)}"
+                    if accepted
+                    else "recall_report needs a trained index or quantizer"
+                )
+            live = self._live_mask()
+            exact = [ids.tolist() for ids, _ in self._exact_search_batch(queries, top_k, live)]
+            report: Dict[int, float] = {}
+            for value in values:
+                approx = [self._search(q, top_k, allowed=live, **{param: value})[0].tolist() for q in queries]
+                report[value] = recall_at_k(approx, exact)
+            return report
+
+    # ------------------------------------------------------------------
+    # Persistence
+    def save(self, path: str | Path) -> None:
+        """Write live vectors, metadata and ids to ``path`` (see :mod:`.persistence`).
+
+        An HNSW graph is written next to it as ``<path>.hnsw.npz`` when no
+        rows are tombstoned (an older graph file is removed otherwise, and
+        the graph is rebuilt on load); other indexes and quantizers are
+        retrained after loading.
+        """
+        graph = Path(f"{path}.hnsw.npz")
+        with self._lock.read():
+            live = self._live_mask()
+            if live is None:
+                write_store(path, self._vectors.array, self._vectors.sq_norms, self._metadata, self._ids, self.metric)
+                if isinstance(self._index, HNSWIndex):
+                    self._index.save(graph)
+                elif graph.exists():
+                    graph.unlink()
+                return
+            if graph.exists():
+                # Its node ids refer to the rows before the tombstones were dropped.
+                graph.unlink()
+            rows = np.flatnonzero(live).tolist()
+            write_store(
+                path,
+                self._vectors.array[rows],
+                self._vectors.sq_norms[rows],
+                [self._metadata[i] for i in rows],
+                [self._ids[i] for i in rows],
+                self.metric,
+            )
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True, **store_kwargs: Any) -> "InMemoryVectorStore":
+        """Open a store written by :meth:`save`.
+
+        With ``mmap=True`` vectors and metadata are memory-mapped, so loading
+        takes constant time and concurrent workers share the same pages.
+        ``store_kwargs`` configure the index/quantization as in ``__init__``;
+        the metric is taken from the file.
+        """
+        vectors, norms, metadata, ids, metric = read_store(path, mmap=mmap)
+        if store_kwargs.setdefault("metric", metric) != metric:
+            raise ValueError(f"{path} was saved with metric {metric!r}, not {store_kwargs['metric']!r}")
+        store = cls(**store_kwargs)
+        if store._quantizer is not None:
+            # Quantized stores keep their own on-disk copy of the raw vectors.
+            store._vectors.append(vectors)
+        else:
+            store._vectors = VectorMatrix.from_array(vectors, norms)
+        store._metadata = metadata
+        store._ids = ids if ids is not None else [None] * len(metadata)
+        graph = Path(f"{path}.hnsw.npz")
+        if isinstance(store._index, HNSWIndex) and graph.exists():
+            loaded = HNSWIndex.load(graph)
+            # A graph over a different row count is stale; rebuild instead.
+            if len(loaded) == len(metadata) and loaded.metric == store.metric:
+                store._index = loaded
+        store._update_indexes()
+        return store
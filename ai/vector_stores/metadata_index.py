@@ -0,0 +1,107 @@
+"""Inverted indexes over metadata fields for filtered vector search."""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Sequence
+
+import numpy as np
+
+_RANGE_OPS = {
+    "$gt": lambda value, bound: value > bound,
+    "$gte": lambda value, bound: value >= bound,
+    "$lt": lambda value, bound: value < bound,
+    "$lte": lambda value, bound: value <= bound,
+}
+
+
+class MetadataIndex:
+    """Map ``field -> value -> posting list of row ids``.
+
+    Posting lists are append-only ``array('q')`` buffers, so indexing a row
+    is O(number of fields) and a list converts to a NumPy id array with a
+    single memory copy.  :meth:`mask` turns a Chroma-style ``where`` clause into a
+    boolean row mask so the store only scores matching rows.
+
+    Supported clauses (combined with AND across fields)::
+
+        {"source": "a.csv"}                       # equality
+        {"doc_id": {"$in": ["d1", "d2"]}}         # membership
+        {"source": {"$ne": "b.csv"}}              # negation ($ne / $nin)
+        {"date": {"$gte": "2024-01-01", "$lt": "2024-02-01"}}  # ranges
+    """
+
+    def __init__(self, fields: Iterable[str] | None = None) -> None:
+        self.fields = set(fields) if fields is not None else None
+        self._postings: Dict[str, Dict[Any, array]] = {}
+        self._indexed = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._indexed
+
+    def update(self, metadata: Sequence[dict]) -> None:
+        """Index every row of ``metadata`` not seen yet."""
+        with self._lock:
+            for row in range(self._indexed, len(metadata)):
+                self._add_row(row, metadata[row])
+            self._indexed = max(self._indexed, len(metadata))
+
+    def _add_row(self, row: int, meta: dict) -> None:
+        for field, value in meta.items():
+            if self.fields is not None and field not in self.fields:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else (value,)
+            postings = self._postings.setdefault(field, {})
+            for item in values:
+                try:
+                    postings.setdefault(item, array("q")).append(row)
+                except TypeError:  # unhashable values are not indexed
+                    continue
+
+    def rows(self, field: str, value: Any) -> np.ndarray:
+        """Return the row ids whose ``field`` equals ``value``."""
+        posting = self._postings.get(field, {}).get(value)
+        if posting is None:
+            return np.empty(0, dtype=np.int64)
+        return np.array(posting, dtype=np.int64)
+
+    def _field_mask(self, field: str, condition: Any, size: int) -> np.ndarray:
+        if self.fields is not None and field not in self.fields:
+            raise ValueError(f"Metadata field '{field}' is not indexed")
+        mask = np.ones(size, dtype=bool)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq":
+                matched = [operand]
+            elif op in ("$in", "$nin"):
+                matched = list(operand)
+            elif op == "$ne":
+                matched = [operand]
+            elif op in _RANGE_OPS:
+                matched = []
+                for value in self._postings.get(field, {}):
+                    try:
+                        if _RANGE_OPS[op](value, operand):
+                            matched.append(value)
+                    except TypeError:  # incomparable types never match
+                        continue
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+
+            op_mask = np.zeros(size, dtype=bool)
+            for value in matched:
+                op_mask[self.rows(field, value)] = True
+            if op in ("$ne", "$nin"):
+                op_mask = ~op_mask
+            mask &= op_mask
+        return mask
+
+    def mask(self, where: dict, size: int) -> np.ndarray:
+        """Return a boolean mask of the rows matching every clause in ``where``."""
+        mask = np.ones(size, dtype=bool)
+        for field, condition in where.items():
+            mask &= self._field_mask(field, condition, size)
+        return mask
@@ -0,0 +1,190 @@
+"""Versioned binary file format for the in-memory vector stores.
+
+Layout (all integers little endian)::
+
+    header    64 bytes   magic, version, count, dim and block offsets
+    vectors   count * dim float32, row major
+    norms     count float32 squared L2 norms
+    offsets   (count + 1) uint64 offsets into the metadata block
+    metadata  concatenated UTF-8 JSON objects, one per row
+    ids       (version 2, when ``flags & HAS_IDS``) another offsets block
+              followed by one JSON-encoded document id per row
+
+Every block starts on a 64-byte boundary so it can be memory-mapped as a
+NumPy array directly.  Loading with ``mmap=True`` therefore only reads the
+header; vectors are paged in on demand and the OS page cache shares them
+between worker processes, and metadata is decoded one row at a time.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap as _mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .matrix import METRICS, check_metric
+
+MAGIC = b"SBVS"
+VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+HAS_IDS = 1
+# Bits 1-2 of ``flags`` hold the index of the distance metric in METRICS.
+METRIC_SHIFT = 1
+METRIC_MASK = 0b11 << METRIC_SHIFT
+HEADER = struct.Struct("<4sIQIIQQQQQ")
+ALIGNMENT = 64
+
+
+def _align(f) -> int:
+    pos = f.tell()
+    pad = -pos % ALIGNMENT
+    if pad:
+        f.write(b"\0" * pad)
+    return pos + pad
+
+
+class LazyMetadata(Sequence):
+    """List-like view decoding JSON rows (metadata or ids) from a buffer on access.
+
+    Rows appended after loading are kept as ordinary dicts.
+    """
+
+    def __init__(self, buffer, offsets: np.ndarray) -> None:
+        self._buffer = buffer
+        self._offsets = offsets
+        self._stored = len(offsets) - 1
+        self._cache: dict[int, dict] = {}
+        self._extra: List[dict] = []
+
+    def __len__(self) -> int:
+        return self._stored + len(self._extra)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= self._stored:
+            return self._extra[index - self._stored]
+        row = self._cache.get(index)
+        if row is None:
+            start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+            row = json.loads(bytes(self._buffer[start:end]))
+            self._cache[index] = row
+        return row
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, row: dict) -> None:
+        self._extra.append(row)
+
+    def extend(self, rows: Iterable[dict]) -> None:
+        self._extra.extend(rows)
+
+
+def _write_json_rows(f, rows: Sequence) -> Tuple[int, int, int]:
+    """Write an offsets block and JSON rows; return their offsets and size."""
+    encoded = [json.dumps(row, separators=(",", ":")).encode("utf-8") for row in rows]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    offsets_off = _align(f)
+    offsets.tofile(f)
+    data_off = _align(f)
+    for chunk in encoded:
+        f.write(chunk)
+    return offsets_off, data_off, int(offsets[-1])
+
+
+def _read_json_rows(buffer, count: int, offsets_off: int, data_off: int, size: int) -> LazyMetadata:
+    offsets = np.frombuffer(buffer, dtype="<u8", count=count + 1, offset=offsets_off)
+    return LazyMetadata(memoryview(buffer)[data_off : data_off + size], offsets)
+
+
+def write_store(
+    path: str | Path,
+    vectors: np.ndarray,
+    norms: np.ndarray,
+    metadata: Sequence[dict],
+    ids: Sequence | None = None,
+    metric: str = "l2",
+) -> None:
+    """Atomically write vectors, norms, metadata and optional ids to ``path``."""
+    path = Path(path)
+    count = len(metadata)
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(b"\0" * HEADER.size)
+        vectors_off = _align(f)
+        np.ascontiguousarray(vectors[:count], dtype=np.float32).tofile(f)
+        norms_off = _align(f)
+        np.ascontiguousarray(norms[:count], dtype=np.float32).tofile(f)
+
+        offsets_off, meta_off, meta_size = _write_json_rows(f, metadata)
+        flags = METRICS.index(check_metric(metric)) << METRIC_SHIFT
+        if ids is not None:
+            flags |= HAS_IDS
+            # The ids block starts at the next aligned offset after metadata.
+            _write_json_rows(f, [ids[i] for i in range(count)])
+
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC, VERSION, count, dim, flags,
+                vectors_off, norms_off, offsets_off, meta_off, meta_size,
+            )
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_store(
+    path: str | Path, mmap: bool = True
+) -> Tuple[np.ndarray, np.ndarray, Sequence[dict], Sequence | None, str]:
+    """Return ``(vectors, norms, metadata, ids, metric)`` stored at ``path``.
+
+    ``ids`` is ``None`` for files written without document ids; files that
+    predate metrics report ``"l2"``.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a vector store file")
+        magic, version, count, dim, flags, vectors_off, norms_off, offsets_off, meta_off, meta_size = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a vector store file")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported vector store format version: {version}")
+
+        if mmap:
+            buffer = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+
+    vectors = np.frombuffer(buffer, dtype=np.float32, count=count * dim, offset=vectors_off).reshape(count, dim)
+    norms = np.frombuffer(buffer, dtype=np.float32, count=count, offset=norms_off)
+    metadata = _read_json_rows(buffer, count, offsets_off, meta_off, meta_size)
+    ids = None
+    if version >= 2 and flags & HAS_IDS:
+        ids_offsets_off = meta_off + meta_size
+        ids_offsets_off += -ids_offsets_off % ALIGNMENT
+        ids_off = ids_offsets_off + (count + 1) * 8
+        ids_off += -ids_off % ALIGNMENT
+        ids_size = int(np.frombuffer(buffer, dtype="<u8", count=1, offset=ids_offsets_off + count * 8)[0])
+        ids = _read_json_rows(buffer, count, ids_offsets_off, ids_off, ids_size)
+    if not mmap:
+        metadata = list(metadata)
+        ids = list(ids) if ids is not None else None
+    metric_code = (flags & METRIC_MASK) >> METRIC_SHIFT
+    if metric_code >= len(METRICS):
+        raise ValueError(f"Unsupported metric code in {path}: {metric_code}")
+    return vectors, norms, metadata, ids, METRICS[metric_code]
@@ -0,0 +1,129 @@
+"""Vector quantizers for compact in-memory storage.
+
+Both quantizers compress float32 vectors into ``uint8`` codes and score a
+float32 query directly against the codes (asymmetric distance computation),
+so the full-precision vectors are only needed to re-rank a short list.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .clustering import assign, kmeans
+from .matrix import check_metric
+
+
+class ScalarQuantizer:
+    """Quantize each dimension independently to 8 bits (4x smaller)."""
+
+    code_dtype = np.uint8
+
+    def __init__(self, chunk_size: int = 8192, metric: str = "l2") -> None:
+        self.chunk_size = chunk_size
+        self.metric = check_metric(metric)
+        self.vmin: np.ndarray | None = None
+        self.scale: np.ndarray | None = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.vmin is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Learn the per-dimension value range from ``vectors``."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.vmin = vectors.min(axis=0)
+        span = vectors.max(axis=0) - self.vmin
+        self.scale = np.where(span > 0, span / 255.0, 1.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return ``uint8`` codes for ``vectors`` (values outside the range clip)."""
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.vmin) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float32 vectors from ``codes``."""
+        return self.vmin + codes.astype(np.float32) * self.scale
+
+    def distances(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Return distances from ``query`` to every encoded row."""
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_size):
+            decoded = self.decode(codes[start : start + self.chunk_size])
+            if self.metric == "l2":
+                diff = decoded - query
+                out[start : start + self.chunk_size] = np.einsum("ij,ij->i", diff, diff)
+            else:
+                out[start : start + self.chunk_size] = -(decoded @ query)
+        if self.metric == "cosine":
+            out += 1.0
+        return out
+
+
+class ProductQuantizer:
+    """Split vectors into ``m`` sub-vectors and encode each with k-means.
+
+    Each sub-vector becomes one byte, so a ``d``-dimensional vector shrinks
+    from ``4 * d`` bytes to ``m`` bytes.
+    """
+
+    code_dtype = np.uint8
+
+    def __init__(
+        self, m: int = 8, nbits: int = 8, n_iter: int = 20, seed: int = 0, metric: str = "l2"
+    ) -> None:
+        if not 1 <= nbits <= 8:
+            raise ValueError("nbits must be between 1 and 8")
+        self.m = m
+        self.metric = check_metric(metric)
+        self.ksub = 2 ** nbits
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks: list[np.ndarray] | None = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def _subspaces(self, dim: int) -> list[slice]:
+        if dim % self.m:
+            raise ValueError(f"Dimension {dim} is not divisible by m={self.m}")
+        step = dim // self.m
+        return [slice(j * step, (j + 1) * step) for j in range(self.m)]
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Learn one k-means codebook per sub-space."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.codebooks = [
+            kmeans(vectors[:, sl], self.ksub, n_iter=self.n_iter, seed=self.seed + j)
+            for j, sl in enumerate(self._subspaces(vectors.shape[1]))
+        ]
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return an ``(n, m)`` array of centroid ids."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((vectors.shape[0], self.m), dtype=np.uint8)
+        for j, sl in enumerate(self._subspaces(vectors.shape[1])):
+            codes[:, j] = assign(vectors[:, sl], self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float32 vectors from ``codes``."""
+        return np.hstack([self.codebooks[j][codes[:, j]] for j in range(self.m)])
+
+    def distances(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Return distances using per-query lookup tables.
+
+        Both squared L2 and the dot product decompose into a sum over
+        sub-spaces, so each needs one ``ksub``-entry table per sub-space.
+        """
+        out = np.zeros(codes.shape[0], dtype=np.float32)
+        for j, sl in enumerate(self._subspaces(query.shape[0])):
+            if self.metric == "l2":
+                diff = self.codebooks[j] - query[sl]
+                table = np.einsum("ij,ij->i", diff, diff)
+            else:
+                table = -(self.codebooks[j] @ query[sl])
+            out += table[codes[:, j]]
+        if self.metric == "cosine":
+            out += 1.0
+        return out
@@ -0,0 +1,100 @@
+"""LRU + TTL cache for retrieval results with per-namespace versions."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Return ``query`` lowercased with runs of whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+
+class RetrievalCache:
+    """Cache query results per namespace (one tenant collection each).
+
+    Every namespace has a version counter; writers call :meth:`bump` after
+    changing the collection, and entries stored under an older version are
+    treated as misses, so results are never stale in this process.  Entries
+    also expire after ``ttl`` seconds (covering writes made by other
+    processes) and the least recently used are evicted beyond ``max_size``.
+    ``hits`` and ``misses`` count lookups for tuning.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float | None = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[Hashable, Hashable], Tuple[int, float, Any]] = OrderedDict()
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, namespace: Hashable) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: Hashable) -> None:
+        """Invalidate every entry of ``namespace``."""
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def get(self, namespace: Hashable, key: Hashable) -> Any | None:
+        """Return the cached value or ``None`` if missing, stale or expired."""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                version, stored_at, value = entry
+                expired = self.ttl is not None and self.clock() - stored_at >= self.ttl
+                if version == self._versions.get(namespace, 0) and not expired:
+                    self._entries.move_to_end((namespace, key))
+                    self.hits += 1
+                    return value
+                del self._entries[(namespace, key)]
+            self.misses += 1
+            return None
+
+    def put(self, namespace: Hashable, key: Hashable, value: Any, version: int | None = None) -> None:
+        """Store ``value``; pass the ``version`` read before computing it.
+
+        A value computed while a write bumped the version is dropped.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            current = self._versions.get(namespace, 0)
+            if version is not None and version != current:
+                return
+            self._entries[(namespace, key)] = (current, self.clock(), value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# Shared by every TenantVectorStore in the process.
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,348 @@
+"""Scatter-gather vector store spreading rows over worker processes."""
+
+from __future__ import annotations
+
+import builtins
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .faiss_store import FaissStore
+
+MANIFEST = "shards.json"
+
+
+def _serve(conn, store_cls: type, store_kwargs: dict, path: str | None) -> None:
+    """Worker loop: own one shard and run the store methods sent over ``conn``.
+
+    Requests are ``(request_id, method, args, kwargs)`` and are answered in
+    order with ``(request_id, "ok", value)`` or ``(request_id, "error",
+    (type name, message))``.  Non-callable attributes (e.g.
+    ``memory_usage``) are returned as is.
+    """
+    store = store_cls.load(path, **store_kwargs) if path else store_cls(**store_kwargs)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        request_id, name, args, kwargs = message
+        try:
+            attr = getattr(store, name)
+            reply = (request_id, "ok", attr(*args, **kwargs) if callable(attr) else attr)
+        except Exception as exc:  # pragma: no cover - re-raised in the parent
+            reply = (request_id, "error", (type(exc).__name__, str(exc)))
+        conn.send(reply)
+    conn.close()
+
+
+def _worker_error(name: str, message: str) -> Exception:
+    """Rebuild a worker's exception: built-in types as is, others as RuntimeError."""
+    exc_type = getattr(builtins, name, None)
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        return exc_type(message)
+    return RuntimeError(f"{name}: {message}")
+
+
+class _Pipe:
+    """Connection to one worker that several threads may use at once.
+
+    Every request carries an id and the worker answers in order.  A caller
+    waiting for its reply takes the receive lock and reads replies until
+    its own arrives, parking the others for their owners.
+    """
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self._ids = itertools.count()
+        self._send_lock = threading.Lock()
+        self._recv_lock = threading.Lock()
+        self._replies: dict[int, tuple] = {}
+
+    def send(self, name: str, args: tuple, kwargs: dict) -> int:
+        with self._send_lock:
+            request_id = next(self._ids)
+            self.conn.send((request_id, name, args, kwargs))
+        return request_id
+
+    def recv(self, request_id: int) -> tuple:
+        """Return ``(status, value)`` of the request ``request_id``."""
+        while True:
+            with self._recv_lock:
+                reply = self._replies.pop(request_id, None)
+                if reply is not None:
+                    return reply
+                reply_id, status, value = self.conn.recv()
+                if reply_id == request_id:
+                    return status, value
+                self._replies[reply_id] = (status, value)
+
+
+class ShardedStore:
+    """Partition rows across ``num_shards`` processes and query them in parallel.
+
+    Each worker process owns an independent ``store_cls`` instance (built
+    from ``store_kwargs``), so exact scans and index searches run on as many
+    cores as there are shards.  :meth:`query` sends the query to every shard
+    at once and merges the per-shard top-k lists with a heap, which makes
+    the store a drop-in for ``RAGPipeline(vector_store=...)``.
+
+    Rows with an id are routed by a stable hash of the id, so upserts and
+    deletes land on the shard holding the old row; rows without one are
+    dealt out round-robin.  :meth:`save` writes one file per shard and
+    :meth:`load` memory-maps them in the workers, so the page cache is
+    shared with any other process serving the same files.
+
+    Threads may call the store concurrently; their requests are pipelined
+    to the workers.  If a worker dies the store is closed and later calls
+    raise :class:`RuntimeError`.  Call :meth:`close` (or use the store as a
+    context manager) to stop the workers.
+    """
+
+    def __init__(
+        self,
+        num_shards: int | None = None,
+        store_cls: type = FaissStore,
+        start_method: str | None = None,
+        **store_kwargs: Any,
+    ) -> None:
+        self._start(num_shards or os.cpu_count() or 1, store_cls, start_method, store_kwargs, None)
+
+    def _start(
+        self,
+        num_shards: int,
+        store_cls: type,
+        start_method: str | None,
+        store_kwargs: dict,
+        paths: Sequence[str] | None,
+    ) -> None:
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        self.num_shards = num_shards
+        self.store_cls = store_cls
+        self._store_kwargs = store_kwargs
+        self._next_shard = 0
+        self._lock = threading.Lock()
+        self._broken: str | None = None
+        self._conns = []
+        self._pipes = []
+        self._workers = []
+        context = multiprocessing.get_context(start_method)
+        for shard in range(num_shards):
+            kwargs = dict(store_kwargs)
+            if kwargs.get("vector_path"):
+                kwargs["vector_path"] = f"{kwargs['vector_path']}.{shard}"
+            parent, child = context.Pipe()
+            path = paths[shard] if paths else None
+            worker = context.Process(
+                target=_serve,
+                args=(child, store_cls, kwargs, path),
+                name=f"vector-shard-{shard}",
+                daemon=True,
+            )
+            worker.start()
+            child.close()
+            self._conns.append(parent)
+            self._pipes.append(_Pipe(parent))
+            self._workers.append(worker)
+
+    # ------------------------------------------------------------------
+    # Worker calls
+    def _call(self, calls: dict[int, Tuple[str, tuple, dict]]) -> dict[int, Any]:
+        """Send ``{shard: (method, args, kwargs)}`` to the workers, then gather."""
+        if self._broken is not None:
+            raise RuntimeError(f"ShardedStore is broken: {self._broken}")
+        pipes = self._pipes
+        if not pipes:
+            raise ValueError("ShardedStore is closed")
+        try:
+            pending = {shard: pipes[shard].send(*message) for shard, message in calls.items()}
+            replies = {shard: pipes[shard].recv(request_id) for shard, request_id in pending.items()}
+        except (EOFError, OSError) as exc:
+            # Replies still queued on the other pipes would be lost or
+            # mismatched, so no further call can be trusted.
+            self._broken = f"a shard worker failed ({exc!r})"
+            self.close()
+            raise RuntimeError(f"ShardedStore is broken: {self._broken}") from exc
+        for status, value in replies.values():
+            if status == "error":
+                raise _worker_error(*value)
+        return {shard: value for shard, (_, value) in replies.items()}
+
+    def _broadcast(self, name: str, *args: Any, **kwargs: Any) -> List[Any]:
+        results = self._call({shard: (name, args, kwargs) for shard in range(self.num_shards)})
+        return [results[shard] for shard in range(self.num_shards)]
+
+    def _shard_of(self, doc_id: Any) -> int:
+        key = json.dumps(doc_id, sort_keys=True, default=str).encode("utf-8")
+        return zlib.crc32(key) % self.num_shards
+
+    # ------------------------------------------------------------------
+    # Writes
+    def add(
+        self,
+        embeddings: Iterable[List[float]],
+        metadata: Iterable[dict],
+        ids: Iterable[Any] | None = None,
+    ) -> None:
+        """Add embeddings with associated metadata, split across the shards."""
+        if not isinstance(embeddings, np.ndarray):
+            embeddings = list(embeddings)
+        metadata = list(metadata)
+        ids = list(ids) if ids is not None else None
+        count = min(len(embeddings), len(metadata))
+        if ids is not None:
+            count = min(count, len(ids))
+        if count == 0:
+            return
+        vectors = np.asarray(embeddings[:count], dtype=np.float32)
+        rows: dict[int, List[int]] = {}
+        for row in range(count):
+            doc_id = ids[row] if ids is not None else None
+            if doc_id is None:
+                shard = self._next_shard
+                self._next_shard = (self._next_shard + 1) % self.num_shards
+            else:
+                shard = self._shard_of(doc_id)
+            rows.setdefault(shard, []).append(row)
+        self._call(
+            {
+                shard: (
+                    "add",
+                    (vectors[selected], [metadata[i] for i in selected]),
+                    {"ids": [ids[i] for i in selected] if ids is not None else None},
+                )
+                for shard, selected in rows.items()
+            }
+        )
+
+    def upsert(self, ids: Iterable[Any], embeddings: Iterable[List[float]], metadata: Iterable[dict]) -> None:
+        """Insert new rows or replace existing ones by document id."""
+        self.add(embeddings, metadata, ids=ids)
+
+    def delete(self, ids: Iterable[Any]) -> int:
+        """Delete rows by document id; return how many were found."""
+        by_shard: dict[int, List[Any]] = {}
+        for doc_id in ids:
+            by_shard.setdefault(self._shard_of(doc_id), []).append(doc_id)
+        if not by_shard:
+            return 0
+        results = self._call({shard: ("delete", (doc_ids,), {}) for shard, doc_ids in by_shard.items()})
+        return sum(results.values())
+
+    def train(self, embeddings: Iterable[List[float]] | None = None) -> None:
+        """Train every shard's index (each on its own rows by default)."""
+        if embeddings is not None and not isinstance(embeddings, np.ndarray):
+            embeddings = np.asarray(list(embeddings), dtype=np.float32)
+        self._broadcast("train", embeddings)
+
+    def compact(self) -> None:
+        """Compact every shard in place."""
+        self._broadcast("compact")
+
+    # ------------------------------------------------------------------
+    # Queries
+    def __len__(self) -> int:
+        return sum(self._broadcast("__len__"))
+
+    @property
+    def memory_usage(self) -> int:
+        """Return the approximate resident bytes used by all shards."""
+        return sum(self._broadcast("memory_usage"))
+
+    @staticmethod
+    def _merge(per_shard: Iterable[List[Tuple[dict, float]]], top_k: int) -> List[Tuple[dict, float]]:
+        merged = heapq.merge(*per_shard, key=lambda item: item[1])
+        return list(itertools.islice(merged, top_k))
+
+    def query(
+        self,
+        embedding: List[float],
+        top_k: int = 5,
+        where: dict | None = None,
+        **search_params: Any,
+    ) -> List[Tuple[dict, float]]:
+        """Return the global top_k metadata items ranked by distance."""
+        query = np.asarray(embedding, dtype=np.float32)
+        results = self._broadcast("query", query, top_k, where, **search_params)
+        return self._merge(results, top_k)
+
+    def query_batch(
+        self,
+        embeddings: Iterable[List[float]],
+        top_k: int = 5,
+        where: dict | None = None,
+        **search_params: Any,
+    ) -> List[List[Tuple[dict, float]]]:
+        """Run :meth:`query` for many embeddings with one round trip per shard."""
+        if not isinstance(embeddings, np.ndarray):
+            embeddings = list(embeddings)
+        if len(embeddings) == 0:
+            return []
+        queries = np.asarray(embeddings, dtype=np.float32)
+        results = self._broadcast("query_batch", queries, top_k, where, **search_params)
+        return [self._merge(per_query, top_k) for per_query in zip(*results)]
+
+    # ------------------------------------------------------------------
+    # Persistence and lifecycle
+    def save(self, directory: str | Path) -> None:
+        """Write one store file per shard plus a manifest into ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        names = [f"shard-{shard}.sbvs" for shard in range(self.num_shards)]
+        self._call({shard: ("save", (str(directory / name),), {}) for shard, name in enumerate(names)})
+        manifest = {"num_shards": self.num_shards, "shards": names}
+        (directory / MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+
+    @classmethod
+    def load(
+        cls,
+        directory: str | Path,
+        store_cls: type = FaissStore,
+        start_method: str | None = None,
+        **store_kwargs: Any,
+    ) -> "ShardedStore":
+        """Start one worker per shard saved by :meth:`save`, memory-mapping its file."""
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+        paths = [str(directory / name) for name in manifest["shards"]]
+        store = cls.__new__(cls)
+        store._start(manifest["num_shards"], store_cls, start_method, store_kwargs, paths)
+        return store
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                conn.close()
+            for worker in self._workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            self._conns = []
+            self._pipes = []
+            self._workers = []
+
+    def __enter__(self) -> "ShardedStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if getattr(self, "_conns", None):
+            self.close()
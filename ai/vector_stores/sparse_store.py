@@ -0,0 +1,294 @@
+"""Vector store for sparse vectors kept as CSR index/value arrays."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from .locks import ReadWriteLock
+from .matrix import check_metric, dots_to_distances, top_k_smallest
+from .metadata_index import MetadataIndex
+
+# A sparse vector: ``(indices, values)``, an ``{index: value}`` mapping, or a
+# dense sequence whose non-zero entries are kept.
+SparseVector = Any
+
+
+def as_sparse(vector: SparseVector) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``vector`` as sorted, duplicate-free ``(int32 indices, float32 values)``.
+
+    Duplicate indices are summed and explicit zeros dropped.
+    """
+    if isinstance(vector, Mapping):
+        indices = np.fromiter(vector.keys(), dtype=np.int64, count=len(vector))
+        values = np.fromiter(vector.values(), dtype=np.float32, count=len(vector))
+    elif isinstance(vector, tuple) and len(vector) == 2 and np.ndim(vector[0]) == 1:
+        indices = np.asarray(vector[0], dtype=np.int64).ravel()
+        values = np.asarray(vector[1], dtype=np.float32).ravel()
+        if indices.shape != values.shape:
+            raise ValueError("Sparse vector indices and values differ in length")
+    else:
+        dense = np.asarray(vector, dtype=np.float32).ravel()
+        indices = np.flatnonzero(dense)
+        values = dense[indices]
+    if indices.size and (indices.min() < 0 or indices.max() > np.iinfo(np.int32).max):
+        raise ValueError("Sparse vector indices must fit in int32")
+    if indices.size > 1 and not np.all(indices[1:] > indices[:-1]):
+        indices, inverse = np.unique(indices, return_inverse=True)
+        values = np.bincount(inverse, weights=values, minlength=indices.size).astype(np.float32)
+    keep = values != 0
+    return indices[keep].astype(np.int32), values[keep]
+
+
+def sparse_dot(
+    indices: np.ndarray,
+    values: np.ndarray,
+    query_indices: np.ndarray,
+    query_values: np.ndarray,
+) -> np.ndarray:
+    """Return per-entry products of stored entries with a sorted sparse query.
+
+    Entries whose index is absent from the query contribute zero.  Cost is
+    ``O(nnz * log(query nnz))`` regardless of the vector dimension.
+    """
+    if not query_indices.size:
+        return np.zeros(indices.shape, dtype=np.float32)
+    pos = np.searchsorted(query_indices, indices)
+    np.minimum(pos, query_indices.size - 1, out=pos)
+    matched = query_indices[pos] == indices
+    return np.where(matched, values * query_values[pos], np.float32(0.0))
+
+
+class _GrowableArray:
+    """1-D NumPy buffer whose capacity doubles when it fills up.
+
+    :attr:`view` returns the populated prefix without copying; appends
+    either write past it or move to a new buffer, so a view taken earlier
+    keeps seeing the same entries.
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int = 64) -> None:
+        self._data = np.empty(max(1, capacity), dtype=dtype)
+        self._size = 0
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> "_GrowableArray":
+        buffer = cls(values.dtype, capacity=values.size)
+        buffer.extend(values)
+        return buffer
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * self._data.itemsize
+
+    def extend(self, values: np.ndarray) -> None:
+        end = self._size + len(values)
+        if end > self._data.size:
+            capacity = self._data.size
+            while capacity < end:
+                capacity *= 2
+            data = np.empty(capacity, dtype=self._data.dtype)
+            data[: self._size] = self._data[: self._size]
+            self._data = data
+        self._data[self._size : end] = values
+        self._size = end
+
+
+class SparseVectorStore:
+    """Keep sparse vectors in append-only CSR arrays and scan them exactly.
+
+    Rows are stored as ``indptr``/``indices``/``values`` NumPy buffers that
+    grow by doubling, like :class:`~ai.vector_stores.matrix.VectorMatrix`,
+    so memory grows with the number of non-zeros, not the dimension, and a
+    query scans views of the buffers without copying them; a 2^18-dim hashed vector
+    with a few hundred terms costs a few kilobytes.  A query is matched
+    against every stored entry with one ``searchsorted`` and summed per row
+    with ``bincount``.  Queries may be sparse (see :func:`as_sparse`) or
+    dense.
+
+    The API mirrors :class:`~ai.vector_stores.memory_store.InMemoryVectorStore`:
+    ``metric`` is ``"ip"``, ``"cosine"`` or ``"l2"`` with smaller-is-closer
+    scores, ``where`` filters on metadata, :meth:`upsert` and :meth:`delete`
+    work by document id and :meth:`compact` drops tombstoned rows.
+    """
+
+    def __init__(self, metric: str = "ip", metadata_fields: Iterable[str] | None = None) -> None:
+        self.metric = check_metric(metric)
+        self._metadata_fields = metadata_fields
+        self._indptr = _GrowableArray.from_array(np.zeros(1, dtype=np.int64))
+        self._indices = _GrowableArray(np.int32)
+        self._values = _GrowableArray(np.float32)
+        # Row of every entry, kept as intp so ``bincount`` takes it as is.
+        self._rows = _GrowableArray(np.intp)
+        self._sq_norms = _GrowableArray(np.float32)
+        self._metadata: List[dict] = []
+        self._metadata_index = MetadataIndex(metadata_fields)
+        self._ids: List[Any] = []
+        self._id_rows: Dict[Any, int] = {}
+        self._deleted: set[int] = set()
+        self._lock = ReadWriteLock()
+
+    def __len__(self) -> int:
+        return len(self._metadata) - len(self._deleted)
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored non-zero entries (tombstoned rows included)."""
+        return len(self._values)
+
+    @property
+    def memory_usage(self) -> int:
+        """Return the bytes held by the CSR buffers."""
+        buffers = (self._indptr, self._indices, self._values, self._rows, self._sq_norms)
+        return sum(buf.nbytes for buf in buffers)
+
+    # ------------------------------------------------------------------
+    # Writes
+    def _prepare(self, vector: SparseVector) -> Tuple[np.ndarray, np.ndarray]:
+        indices, values = as_sparse(vector)
+        if self.metric == "cosine" and values.size:
+            values = values / np.float32(np.linalg.norm(values))
+        return indices, values
+
+    def add(
+        self,
+        embeddings: Iterable[SparseVector],
+        metadata: Iterable[dict],
+        ids: Iterable[Any] | None = None,
+    ) -> None:
+        """Add sparse vectors with associated metadata.
+
+        Rows whose id is already stored replace (tombstone) the old row.
+        """
+        embeddings = list(embeddings)
+        metadata = [dict(meta) for meta in metadata]
+        ids = list(ids) if ids is not None else [None] * len(metadata)
+        count = min(len(embeddings), len(metadata), len(ids))
+        prepared = [self._prepare(vector) for vector in embeddings[:count]]
+        with self._lock.write():
+            for (indices, values), meta, doc_id in zip(prepared, metadata, ids):
+                row = len(self._metadata)
+                self._indices.extend(indices)
+                self._values.extend(values)
+                self._rows.extend(np.full(indices.size, row, dtype=np.intp))
+                self._indptr.extend([len(self._values)])
+                self._sq_norms.extend([values @ values])
+                self._metadata.append(meta)
+                self._ids.append(doc_id)
+                if doc_id is not None:
+                    previous = self._id_rows.get(doc_id)
+                    if previous is not None:
+                        self._deleted.add(previous)
+                    self._id_rows[doc_id] = row
+            self._metadata_index.update(self._metadata)
+
+    def upsert(self, ids: Iterable[Any], embeddings: Iterable[SparseVector], metadata: Iterable[dict]) -> None:
+        """Insert new rows or replace existing ones by document id."""
+        self.add(embeddings, metadata, ids=ids)
+
+    def delete(self, ids: Iterable[Any]) -> int:
+        """Tombstone the rows stored under ``ids``; return how many were found."""
+        removed = 0
+        with self._lock.write():
+            for doc_id in ids:
+                row = self._id_rows.pop(doc_id, None)
+                if row is not None:
+                    self._deleted.add(row)
+                    removed += 1
+        return removed
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and their entries from the buffers."""
+        with self._lock.write():
+            if not self._deleted:
+                return
+            live = np.ones(len(self._metadata), dtype=bool)
+            live[list(self._deleted)] = False
+            keep_rows = np.flatnonzero(live)
+            rows = self._rows.view
+            keep = live[rows]
+            # Renumber the surviving rows 0..n-1 in their original order.
+            new_row = np.cumsum(live) - 1
+            lengths = np.diff(self._indptr.view)[keep_rows]
+            self._indices = _GrowableArray.from_array(self._indices.view[keep])
+            self._values = _GrowableArray.from_array(self._values.view[keep])
+            self._rows = _GrowableArray.from_array(new_row[rows[keep]].astype(np.intp))
+            self._indptr = _GrowableArray.from_array(np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+            self._sq_norms = _GrowableArray.from_array(self._sq_norms.view[keep_rows])
+            self._metadata = [self._metadata[row] for row in keep_rows.tolist()]
+            self._ids = [self._ids[row] for row in keep_rows.tolist()]
+            self._id_rows = {doc_id: row for row, doc_id in enumerate(self._ids) if doc_id is not None}
+            self._metadata_index = MetadataIndex(self._metadata_fields)
+            self._metadata_index.update(self._metadata)
+            self._deleted = set()
+
+    # ------------------------------------------------------------------
+    # Queries
+    def get_vector(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the stored ``(indices, values)`` of ``row``."""
+        start, end = self._indptr.view[row : row + 2]
+        return self._indices.view[start:end].copy(), self._values.view[start:end].copy()
+
+    def _allowed(self, where: dict | None) -> np.ndarray | None:
+        """Return the mask of rows a query may return (``None`` = all rows)."""
+        mask = None
+        if self._deleted:
+            mask = np.ones(len(self._metadata), dtype=bool)
+            mask[list(self._deleted)] = False
+        if where:
+            matching = self._metadata_index.mask(where, len(self._metadata))
+            mask = matching if mask is None else mask & matching
+        return mask
+
+    def _snapshot(self) -> Tuple[np.ndarray, ...]:
+        """Return views of the populated buffers (no copy)."""
+        return (self._indices.view, self._values.view, self._rows.view, self._sq_norms.view)
+
+    def _search(
+        self,
+        query: SparseVector,
+        top_k: int,
+        allowed: np.ndarray | None,
+        snapshot: Tuple[np.ndarray, ...],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        query_indices, query_values = self._prepare(query)
+        indices, values, rows, sq_norms = snapshot
+        products = sparse_dot(indices, values, query_indices, query_values)
+        dots = np.bincount(rows, weights=products, minlength=len(self._metadata)).astype(np.float32)
+        dists = dots_to_distances(dots, sq_norms, float(query_values @ query_values), self.metric)
+        if allowed is not None:
+            dists[~allowed] = np.inf
+        order = top_k_smallest(dists, top_k)
+        if allowed is not None:
+            order = order[np.isfinite(dists[order])]
+        return order, dists[order]
+
+    def _rows_of(self, ids: np.ndarray, dists: np.ndarray) -> List[Tuple[dict, float]]:
+        return [(self._metadata[i], float(d)) for i, d in zip(ids.tolist(), dists.tolist())]
+
+    def query(self, embedding: SparseVector, top_k: int = 5, where: dict | None = None) -> List[Tuple[dict, float]]:
+        """Return top_k metadata items ranked by distance."""
+        with self._lock.read():
+            if not self._metadata:
+                return []
+            return self._rows_of(*self._search(embedding, top_k, self._allowed(where), self._snapshot()))
+
+    def query_batch(
+        self, embeddings: Iterable[SparseVector], top_k: int = 5, where: dict | None = None
+    ) -> List[List[Tuple[dict, float]]]:
+        """Run :meth:`query` for many sparse vectors under one read lock."""
+        embeddings = list(embeddings)
+        with self._lock.read():
+            if not self._metadata:
+                return [[] for _ in embeddings]
+            allowed = self._allowed(where)
+            snapshot = self._snapshot()
+            return [self._rows_of(*self._search(vector, top_k, allowed, snapshot)) for vector in embeddings]
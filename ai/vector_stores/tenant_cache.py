@@ -0,0 +1,142 @@
+"""Bounded cache of open per-tenant vector stores."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+from .chroma_store import TenantVectorStore
+from .retrieval_cache import retrieval_cache
+
+
+def _is_stale(store: TenantVectorStore) -> bool:
+    is_stale = getattr(store, "is_stale", None)
+    return bool(is_stale and is_stale())
+
+
+def _drop_cached_results(store: TenantVectorStore) -> None:
+    cache = getattr(store, "cache", None)
+    if cache is not None:
+        cache.bump(store.persist_path)
+
+
+def _close_all(stores) -> None:
+    for store in stores:
+        close = getattr(store, "close", None)
+        if close is not None:
+            close()
+
+
+class TenantStoreCache:
+    """Reuse :class:`TenantVectorStore` handles across requests.
+
+    Opening a store creates a Chroma client and reopens the tenant's SQLite
+    file and collection, so stores are kept per ``(tenant_id, persist_dir)``
+    and handed out again on later calls.  At most ``max_size`` stores stay
+    open (least recently used are evicted first) and stores unused for
+    ``idle_timeout`` seconds are dropped on the next access.  A store whose
+    files were changed by another process (see
+    :meth:`~ai.vector_stores.chroma_store.TenantVectorStore.is_stale`) is
+    reopened, and its cached retrieval results dropped, on the next access.
+    Call :meth:`invalidate` when a tenant is deleted or reconfigured.
+    Every store dropped from the cache is closed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        idle_timeout: float | None = 600.0,
+        factory: Callable[..., TenantVectorStore] = TenantVectorStore,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        self.clock = clock
+        self._stores: OrderedDict[Tuple[str, str], Tuple[TenantVectorStore, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return any(key[0] == tenant_id for key in self._stores)
+
+    def _evict_idle(self, now: float) -> list:
+        """Remove and return the stores idle for ``idle_timeout`` or longer."""
+        evicted = []
+        if self.idle_timeout is None:
+            return evicted
+        # Entries are kept in access order, so idle ones sit at the front.
+        while self._stores:
+            key, (store, last_used) = next(iter(self._stores.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._stores[key]
+            evicted.append(store)
+        return evicted
+
+    def get(self, tenant_id: str, persist_dir: str = "vector_store") -> TenantVectorStore:
+        """Return the open store for ``tenant_id``, opening it if needed."""
+        key = (tenant_id, persist_dir)
+        stale = None
+        with self._lock:
+            now = self.clock()
+            evicted = self._evict_idle(now)
+            entry = self._stores.get(key)
+            if entry is not None and _is_stale(entry[0]):
+                stale = self._stores.pop(key)[0]
+                evicted.append(stale)
+            elif entry is not None:
+                self._stores[key] = (entry[0], now)
+                self._stores.move_to_end(key)
+        _close_all(evicted)
+        if entry is not None and stale is None:
+            return entry[0]
+        if stale is not None:
+            _drop_cached_results(stale)
+
+        # Open outside the lock so a slow first open does not block other tenants.
+        store = self.factory(tenant_id, persist_dir=persist_dir)
+
+        evicted = []
+        with self._lock:
+            entry = self._stores.get(key)
+            if entry is not None:  # another request opened it meanwhile
+                evicted.append(store)
+                store = entry[0]
+            self._stores[key] = (store, self.clock())
+            self._stores.move_to_end(key)
+            while len(self._stores) > self.max_size:
+                evicted.append(self._stores.popitem(last=False)[1][0])
+        _close_all(evicted)
+        return store
+
+    def invalidate(self, tenant_id: str, persist_dir: str = "vector_store") -> None:
+        """Drop every cached store of ``tenant_id`` (e.g. after delete or reload).
+
+        Their cached retrieval results are dropped too, including those of
+        the store under ``persist_dir`` when it is not open here.
+        """
+        with self._lock:
+            stale = [self._stores.pop(key)[0] for key in [key for key in self._stores if key[0] == tenant_id]]
+        retrieval_cache.bump(os.path.join(persist_dir, tenant_id))
+        for store in stale:
+            _drop_cached_results(store)
+        _close_all(stale)
+
+    def clear(self) -> None:
+        """Drop all cached stores."""
+        with self._lock:
+            stores = [store for store, _ in self._stores.values()]
+            self._stores.clear()
+        _close_all(stores)
+
+
+# Shared by RAGPipeline and the API routes.
+tenant_stores = TenantStoreCache()
@@ -0,0 +1,178 @@
+"""Trigram index answering case-insensitive substring queries."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+N = 3
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the distinct lowercase trigrams of ``text``."""
+    text = text.lower()
+    return {text[i : i + N] for i in range(len(text) - N + 1)}
+
+
+class TrigramIndex:
+    """Map every lowercase trigram to the slots of the documents containing it.
+
+    A query of at least three characters can only match documents holding
+    all of its trigrams, so :meth:`search` intersects those posting lists
+    (smallest first) and runs the substring check on the survivors only.
+    Shorter queries fall back to checking every document.
+
+    Documents are appended to a JSON-lines log at ``path`` and the postings
+    are built from it, so the index survives restarts without rescanning
+    the vector store.  Lines appended by other processes (loader scripts,
+    other API workers) are picked up by the next :meth:`search`,
+    :meth:`items` or :meth:`since` call; if the log is replaced the index is
+    rebuilt and :attr:`generation` incremented.  Re-adding a ``doc_id``
+    replaces its text.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self.generation = 0
+        self._offset = 0
+        self._inode: int | None = None
+        self._lock = threading.Lock()
+        self._reset()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self) -> None:
+        self._texts: List[str | None] = []
+        self._doc_ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._postings: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def exists(self) -> bool:
+        """Return whether the index has been persisted before."""
+        return bool(self.path) and os.path.exists(self.path)
+
+    def _refresh(self) -> None:
+        """Index complete lines appended to the log since the last read."""
+        if not self.path:
+            return
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino == self._inode and st.st_size == self._offset:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            if self._inode is not None:
+                self._reset()
+                self.generation += 1
+            self._inode, self._offset = st.st_ino, 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # A line still being written by another process is read next time.
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                doc_id, text = json.loads(line)
+                self._index(doc_id, text)
+        self._offset += end
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Return the indexed ``(doc_id, text)`` pairs."""
+        with self._lock:
+            self._refresh()
+            return [(doc_id, self._texts[slot]) for doc_id, slot in self._slots.items()]
+
+    def since(self, position: int) -> Tuple[int, List[Tuple[str, str]]]:
+        """Return ``(new_position, pairs)`` indexed after ``position``.
+
+        ``position`` starts at 0 and is only meaningful for the current
+        :attr:`generation`.  Lets dependent indexes (BM25) follow the log.
+        """
+        with self._lock:
+            self._refresh()
+            pairs = [
+                (self._doc_ids[slot], self._texts[slot])
+                for slot in range(position, len(self._texts))
+                if self._texts[slot] is not None
+            ]
+            return len(self._texts), pairs
+
+    def texts(self, doc_ids: Iterable[str]) -> List[str]:
+        """Return the current texts of ``doc_ids`` (unknown ids are skipped)."""
+        with self._lock:
+            slots = (self._slots.get(doc_id) for doc_id in doc_ids)
+            return [self._texts[slot] for slot in slots if slot is not None]
+
+    def _index(self, doc_id: str, text: str) -> None:
+        previous = self._slots.get(doc_id)
+        if previous is not None:
+            self._texts[previous] = None
+        slot = len(self._texts)
+        self._texts.append(text)
+        self._doc_ids.append(doc_id)
+        self._slots[doc_id] = slot
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, array("q")).append(slot)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index ``text`` under ``doc_id`` and append it to the log."""
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Index several ``(doc_id, text)`` pairs with one log write."""
+        documents = list(documents)
+        if not documents:
+            return
+        with self._lock:
+            if not self.path:
+                for doc_id, text in documents:
+                    self._index(doc_id, text)
+                return
+            self._refresh()
+            with open(self.path, "a", encoding="utf-8") as f:
+                for doc_id, text in documents:
+                    f.write(json.dumps([doc_id, text], ensure_ascii=False) + "\n")
+            # Indexed from the log, in the order other writers interleaved.
+            self._refresh()
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        grams = trigrams(query)
+        if not grams:
+            return range(len(self._texts))
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        slots = np.array(postings[0], dtype=np.int64)
+        for posting in postings[1:]:
+            slots = np.intersect1d(slots, np.array(posting, dtype=np.int64), assume_unique=True)
+            if not slots.size:
+                break
+        return slots.tolist()
+
+    def search(self, query: str, limit: int | None = None) -> List[str]:
+        """Return documents containing ``query`` (case-insensitive) in insertion order."""
+        query_lower = query.lower()
+        matches: List[str] = []
+        with self._lock:
+            self._refresh()
+            for slot in self._candidates(query_lower):
+                text = self._texts[slot]
+                if text is not None and query_lower in text.lower():
+                    matches.append(text)
+                    if limit is not None and len(matches) >= limit:
+                        break
+        return matches
@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from ai.models.ollama_model import aclose_clients, close_clients
 from . import routes_chat, routes_admin, routes_auth, routes_files
 
-app = FastAPI(title="SmartBase API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the tenants' models while the server starts accepting requests.
+    routes_chat.warm_up_models()
+    yield
+    close_clients()
+    await aclose_clients()
+
+
+app = FastAPI(title="SmartBase API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -4,6 +4,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
+from ai.vector_stores import tenant_stores
 from tenants.tenant_manager import TenantManager
 from db import user_repository, audit_log_repository
 from .auth_middleware import require_role
@@ -60,6 +61,7 @@ def update_tenant(tenant_id: str, data: TenantData, user=Depends(require_role(["
     if manager.get(tenant_id) is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
     manager.create(tenant_id, data.config)
+    tenant_stores.invalidate(tenant_id)
     audit_log_repository.log_action(user["username"], "update_tenant", tenant_id)
     return {"status": "updated"}
 
@@ -68,6 +70,7 @@ def update_tenant(tenant_id: str, data: TenantData, user=Depends(require_role(["
 def delete_tenant(tenant_id: str, user=Depends(require_role(["super_admin"]))):
     """Delete a tenant."""
     manager.delete(tenant_id)
+    tenant_stores.invalidate(tenant_id)
     audit_log_repository.log_action(user["username"], "delete_tenant", tenant_id)
     return {"status": "deleted"}
 
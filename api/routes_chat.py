@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
+from ai.models.ollama_model import OllamaModel
 from chatbot.conversation_manager import ConversationManager
 from chatbot.response_generator import ResponseGenerator
 from tenants.tenant_manager import TenantManager
+import json
 import logging
+import threading
 
 from db import conversation_repository, audit_log_repository
 from .auth_middleware import get_current_user
@@ -24,9 +28,26 @@ class ChatRequest(BaseModel):
     message: str
 
 
-@router.post("/message")
-def chat_message(req: ChatRequest, user=Depends(get_current_user)):
-    """Receive a chat message and return a generated reply."""
+def _model_kwargs(tenant_config: dict) -> dict:
+    """Return the model arguments configured for a tenant.
+
+    As in :class:`ai.model_manager.ModelManager`, a ``model_name`` in the
+    tenant's ``model_config`` overrides its top-level ``model_name``.
+    Other ``model_config`` keys reach the model only for Ollama tenants,
+    and only those :class:`OllamaModel` accepts.
+    """
+    config = tenant_config.get("model_config") or {}
+    kwargs = {"model_name": config.get("model_name", tenant_config.get("model_name", "llama3.2"))}
+    if tenant_config.get("model_type", "ollama") == "ollama":
+        kwargs.update((key, config[key]) for key in OllamaModel.CONFIG_KEYS if key in config)
+    return kwargs
+
+
+def _start_chat(req: ChatRequest, user: dict) -> tuple[str, str, ResponseGenerator, list]:
+    """Authorize ``req``, record the user message and build its generator.
+
+    Returns ``(tenant_id, model_type, generator, history)``.
+    """
     # Load tenant configuration to determine which model to use
     tenant_id = req.tenant_id.strip()
     if user.get("role") != "super_admin" and user.get("tenant_id") != tenant_id:
@@ -37,7 +58,10 @@ def chat_message(req: ChatRequest, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Tenant not found")
 
     model_type = tenant_config.get("model_type", "ollama")
-    model_name = tenant_config.get("model_name", "llama3.2")
+    # Build the generator first so a bad configuration records nothing.
+    generator = ResponseGenerator(
+        tenant_id=tenant_id, model_type=model_type, **_model_kwargs(tenant_config)
+    )
 
     conversation_manager.start_session(req.session_id)
     conversation_manager.add_message(req.session_id, "user", req.message)
@@ -45,21 +69,63 @@ def chat_message(req: ChatRequest, user=Depends(get_current_user)):
         req.session_id, user["username"], tenant_id, "user", req.message
     )
     history = conversation_manager.history(req.session_id)
-
-    generator = ResponseGenerator(
-        tenant_id=tenant_id,
-        model_type=model_type,
-        model_name=model_name,
+    return tenant_id, model_type, generator, history
+
+
+def warm_up_models() -> threading.Thread:
+    """Load every tenant's Ollama model in the background.
+
+    Tenants opt out with ``"preload": false`` in their ``model_config``.
+    A tenant whose configuration cannot build a model is logged and
+    skipped.  Returns the (daemon) thread doing the warm-up.
+    """
+
+    def run() -> None:
+        models = {}
+        for tenant_id in tenant_manager.list():
+            config = tenant_manager.get(tenant_id) or {}
+            if config.get("model_type", "ollama") != "ollama":
+                continue
+            try:
+                model = OllamaModel(**_model_kwargs(config))
+            except Exception:
+                logger.exception("Invalid model_config for tenant %s", tenant_id)
+                continue
+            if model.preload:
+                models.setdefault((model.base_url, model.model_name), model)
+        for model in models.values():
+            if not model.warm_up():
+                logger.warning("Could not preload Ollama model %s at %s", model.model_name, model.base_url)
+
+    thread = threading.Thread(target=run, name="ollama-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _finish_chat(req: ChatRequest, user: dict, tenant_id: str, reply: str, action: str) -> None:
+    """Record the assistant reply in the session and the audit log."""
+    conversation_manager.add_message(req.session_id, "assistant", reply)
+    conversation_repository.add_message(
+        req.session_id, user["username"], tenant_id, "assistant", reply
     )
+    audit_log_repository.log_action(user["username"], action, req.session_id)
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/message")
+def chat_message(req: ChatRequest, user=Depends(get_current_user)):
+    """Receive a chat message and return a generated reply."""
+    tenant_id, model_type, generator, history = _start_chat(req, user)
     reply = generator.generate_response(req.message, history)
     if model_type == "ollama" and not reply.startswith("[Ollama"):
         reply = f"[Ollama] {reply}"
 
-    conversation_manager.add_message(req.session_id, "assistant", reply)
-    conversation_repository.add_message(
-        req.session_id, user["username"], tenant_id, "assistant", reply
-    )
-    audit_log_repository.log_action(user["username"], "chat_message", req.session_id)
+    _finish_chat(req, user, tenant_id, reply, "chat_message")
     return {
         "reply": reply,
         "history": conversation_repository.get_history(
@@ -68,6 +134,49 @@ def chat_message(req: ChatRequest, user=Depends(get_current_user)):
     }
 
 
+@router.post("/stream")
+def chat_stream(req: ChatRequest, user=Depends(get_current_user)):
+    """Stream the reply as Server-Sent Events while it is generated.
+
+    Each fragment is sent as ``data: {"token": ...}``; a final ``done``
+    event carries the whole reply once it has been stored in the history.
+    If the client disconnects early the partial reply is stored instead.
+    """
+    tenant_id, model_type, generator, history = _start_chat(req, user)
+
+    def events():
+        parts: list[str] = []
+        finished = persisted = False
+        try:
+            for token in generator.stream_response(req.message, history):
+                if not token:
+                    continue
+                if not parts and model_type == "ollama" and not token.startswith("[Ollama"):
+                    token = f"[Ollama] {token}"
+                parts.append(token)
+                yield _sse({"token": token})
+            reply = "".join(parts).strip()
+            # Set first: if storing fails partway, retrying below could
+            # store the reply twice.
+            persisted = True
+            _finish_chat(req, user, tenant_id, reply, "chat_stream")
+            finished = True
+            yield _sse({"reply": reply}, event="done")
+        except Exception:
+            logger.exception("Streaming reply failed for session %s", req.session_id)
+            if not finished:
+                yield _sse({"detail": "Generation failed"}, event="error")
+        finally:
+            if not persisted and parts:
+                _finish_chat(req, user, tenant_id, "".join(parts).strip(), "chat_stream")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history")
 def chat_history(session_id: str, user=Depends(get_current_user)):
     """Return chat history for a session."""
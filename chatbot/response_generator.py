@@ -17,7 +17,7 @@ lookups fail, ``"No information"`` is returned.
 from __future__ import annotations
 
 import re
-from typing import Iterable, Mapping
+from typing import Iterable, Iterator, Mapping
 
 from ai.models.ollama_model import OllamaModel
 from ai.models.openai_model import OpenAIModel
@@ -99,6 +99,17 @@ class ResponseGenerator:
             f"User: {user_message}\nAssistant:"
         )
 
+    def _prompt_for(
+        self, user_message: str, history: Iterable[Mapping[str, str]] | None
+    ) -> str | None:
+        """Return the model prompt, or ``None`` when neither source has context."""
+        db_text = self._lookup_db(user_message)
+        rag_text = self._search_rag(user_message)
+        context = self._merge_sources(db_text, rag_text)
+        if not context:
+            return None
+        return self._build_prompt(user_message, history, context)
+
     # ------------------------------------------------------------------
     def generate_response(
         self, user_message: str, history: Iterable[Mapping[str, str]] | None = None
@@ -110,16 +121,26 @@ class ResponseGenerator:
         "no information" message is returned.
         """
 
-        db_text = self._lookup_db(user_message)
-        rag_text = self._search_rag(user_message)
-        context = self._merge_sources(db_text, rag_text)
-
-        if not context:
+        prompt = self._prompt_for(user_message, history)
+        if prompt is None:
             return "No information"
-
-        prompt = self._build_prompt(user_message, history, context)
         return self.model.generate(prompt)
 
+    def stream_response(
+        self, user_message: str, history: Iterable[Mapping[str, str]] | None = None
+    ) -> Iterator[str]:
+        """Like :meth:`generate_response` but yield the reply as it is generated.
+
+        Retrieval runs before the first fragment; the model's fragments are
+        then passed through as soon as they arrive.
+        """
+
+        prompt = self._prompt_for(user_message, history)
+        if prompt is None:
+            yield "No information"
+            return
+        yield from self.model.stream(prompt)
+
 
 # ---------------------------------------------------------------------------
 # Extension notes
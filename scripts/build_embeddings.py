@@ -12,13 +12,20 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from ingestion.etl_manager import ETLManager
-from ai.embeddings import OpenAIEmbeddings, LocalEmbeddings, HuggingFaceEmbeddings
+from ai.embeddings import (
+    EmbeddingCache,
+    HashingEmbeddings,
+    HuggingFaceEmbeddings,
+    LocalEmbeddings,
+    OpenAIEmbeddings,
+)
 
 
 EMBEDDER_MAP = {
     "openai": OpenAIEmbeddings,
     "local": LocalEmbeddings,
     "huggingface": HuggingFaceEmbeddings,
+    "hashing": HashingEmbeddings,
 }
 
 
@@ -38,11 +45,28 @@ def main() -> None:
         help="Embedding backend to use",
     )
     parser.add_argument(
-        "--dimension", type=int, default=3, help="Embedding vector dimension"
+        "--dimension",
+        type=int,
+        help="Embedding vector dimension (default: 512 for hashing, 3 for the mock backends)",
     )
     parser.add_argument(
         "--output", type=Path, required=True, help="File to write embeddings to"
     )
+    parser.add_argument(
+        "--idf",
+        type=Path,
+        help="Where the hashing backend saves its IDF statistics for the "
+        "embedding server's --idf (default: <output>.idf.npz)",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        type=Path,
+        default=Path("vector_store/embedding_cache.sqlite3"),
+        help="SQLite file caching embeddings of unchanged texts between runs",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Embed every text without the cache"
+    )
     parser.add_argument(
         "--tenant-id",
         help="Optional tenant identifier to populate its vector store",
@@ -59,14 +83,21 @@ def main() -> None:
     etl.close()
 
     embedder_cls = EMBEDDER_MAP[args.embedder]
-    embedder = embedder_cls(dimension=args.dimension)
-
     texts = [r["text"] for r in records]
     metadata = [r["metadata"] for r in records]
-    vectors = embedder.embed(texts)
+    if embedder_cls is HashingEmbeddings:
+        # Cheap to recompute, and its IDF weights depend on the corpus.
+        embedder = HashingEmbeddings(dimension=args.dimension or 512).fit(texts)
+        idf_path = args.idf or args.output.with_name(args.output.name + ".idf.npz")
+        embedder.save(idf_path)
+        print(f"Wrote IDF statistics to {idf_path}")
+    else:
+        cache = None if args.no_cache else EmbeddingCache(args.embedding_cache)
+        embedder = embedder_cls(dimension=args.dimension or 3, cache=cache)
+    vectors = embedder.embed_array(texts)
 
     output_data = [
-        {"embedding": vec, "metadata": meta} for vec, meta in zip(vectors, metadata)
+        {"embedding": vec, "metadata": meta} for vec, meta in zip(vectors.tolist(), metadata)
     ]
     with args.output.open("w", encoding="utf-8") as f:
         json.dump(output_data, f, indent=2)
@@ -77,9 +108,8 @@ def main() -> None:
         from ai.vector_stores.chroma_store import TenantVectorStore
 
         store = TenantVectorStore(args.tenant_id)
-        for idx, text in enumerate(texts):
-            doc_id = metadata[idx].get("doc_id", f"doc{idx}")
-            store.add_document(doc_id, text, metadata[idx])
+        ids = [meta.get("doc_id", f"doc{idx}") for idx, meta in enumerate(metadata)]
+        store.add_documents(ids, texts, metadata)
 
 
 if __name__ == "__main__":
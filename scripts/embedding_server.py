@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Run the embedding server shared by all API worker processes."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Callable, List, Sequence, Tuple
+
+# Ensure project root is on the path when executed directly
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ai.embeddings import HashingEmbeddings, HuggingFaceEmbeddings, LocalEmbeddings, OpenAIEmbeddings
+from ai.embeddings.server import EmbeddingServer
+
+
+def load_backend(
+    name: str, model: str, dimension: int | None, idf: Path | None = None
+) -> Tuple[Callable[[List[str]], Sequence[Any]], str]:
+    """Return the backend's embedding function and the model name it serves."""
+    if name == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        encoder = SentenceTransformer(model)
+        return (lambda texts: encoder.encode(texts, convert_to_numpy=True)), model
+    if name == "hashing":
+        # Queries must be weighted with the IDF of the indexed corpus.
+        hashing = HashingEmbeddings.load(idf) if idf else HashingEmbeddings(dimension=dimension or 512)
+        if dimension and dimension != hashing.dimension:
+            raise SystemExit(f"{idf} holds {hashing.dimension}-dim statistics, not {dimension}")
+        return hashing.embed_array, f"hashing-{hashing.dimension}-{hashing.fingerprint}"
+    backends = {
+        "local": LocalEmbeddings,
+        "openai": OpenAIEmbeddings,
+        "huggingface": HuggingFaceEmbeddings,
+    }
+    dimension = dimension or 3
+    return backends[name](dimension=dimension).embed_array, f"{name}-{dimension}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve embeddings over a Unix socket")
+    parser.add_argument("--socket", default="/tmp/smartbase-embed.sock", help="Unix socket path")
+    parser.add_argument(
+        "--backend",
+        choices=["sentence-transformers", "local", "openai", "huggingface", "hashing"],
+        default="sentence-transformers",
+    )
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument(
+        "--dimension", type=int, help="Embedding dimension (default: 512 for hashing, 3 for the mock backends)"
+    )
+    parser.add_argument(
+        "--idf", type=Path, help="IDF statistics saved by build_embeddings.py for the hashing backend"
+    )
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.idf and args.backend != "hashing":
+        parser.error("--idf only applies to the hashing backend")
+    # Clients cache vectors under the model name, so it must identify the vectors.
+    embed_fn, model_name = load_backend(args.backend, args.model, args.dimension, args.idf)
+    with EmbeddingServer(args.socket, embed_fn, max_batch=args.max_batch, model=model_name) as server:
+        print(f"Serving {args.backend} embeddings on {args.socket}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
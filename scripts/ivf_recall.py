@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Report IVF recall@k against exact search for a set of embeddings."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+# Ensure project root is on the path when executed directly
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ai.vector_stores import FaissStore
+from ai.vector_stores.ivf_index import format_recall_report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure IVF recall per nprobe")
+    parser.add_argument(
+        "embeddings", type=Path, help="JSON file written by build_embeddings.py"
+    )
+    parser.add_argument("--nlist", type=int, default=100, help="Number of IVF cells")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument(
+        "--queries", type=int, default=100, help="Number of sampled query vectors"
+    )
+    parser.add_argument(
+        "--nprobe",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32],
+        help="nprobe values to evaluate",
+    )
+    args = parser.parse_args()
+
+    with args.embeddings.open("r", encoding="utf-8") as f:
+        records = json.load(f)
+    vectors = [r["embedding"] for r in records]
+    metadata = [r.get("metadata", {}) for r in records]
+
+    store = FaissStore(index="ivf", nlist=args.nlist)
+    store.add(vectors, metadata)
+    store.train()
+
+    queries = random.Random(0).sample(vectors, min(args.queries, len(vectors)))
+    report = store.recall_report(queries, top_k=args.top_k, values=args.nprobe)
+    print(format_recall_report(report, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
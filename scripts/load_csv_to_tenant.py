@@ -30,19 +30,19 @@ def load_csv_to_tenant(tenant_id, csv_file, show_progress=False):
 
     with open(csv_file, "r", encoding="utf-8") as f:
         reader = list(csv.DictReader(f))
-        iterator = tqdm(reader, desc="📥 Loading documents", unit="doc") if show_progress and tqdm else reader
-
-        for idx, row in enumerate(iterator, start=1):
-            # Use row number as unique ID
-            doc_id = f"row{idx}"
-            text_parts = [f"{k}: {v}" for k, v in row.items()]
-            text = ", ".join(text_parts)
-
-            store.add_document(
-                doc_id,
-                text,
-                {"source": csv_file}
-            )
+
+    # Use row number as unique ID
+    ids = [f"row{idx}" for idx in range(1, len(reader) + 1)]
+    texts = [", ".join(f"{k}: {v}" for k, v in row.items()) for row in reader]
+
+    progress = None
+    bar = tqdm(total=len(reader), desc="📥 Loading documents", unit="doc") if show_progress and tqdm else None
+    if bar is not None:
+        progress = lambda done, total: bar.update(done - bar.n)
+
+    store.add_documents(ids, texts, [{"source": csv_file} for _ in texts], progress=progress)
+    if bar is not None:
+        bar.close()
 
     print(f"✅ Loaded {len(reader)} documents into tenant '{tenant_id}' vector store.")
 
@@ -4,7 +4,10 @@
 from __future__ import annotations
 
 import argparse
+import os
+import subprocess
 import sys
+import time
 from pathlib import Path
 
 import uvicorn
@@ -13,6 +16,24 @@ import uvicorn
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from api.app import app
+from ai.embeddings.server import EMBEDDING_SOCKET_ENV
+
+
+def start_embedding_server(socket_path: str) -> subprocess.Popen:
+    """Start the shared embedding server and wait for its socket."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("embedding_server.py")), "--socket", socket_path],
+    )
+    deadline = time.monotonic() + 120
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("Embedding server failed to start")
+        time.sleep(0.1)
+    # Workers inherit the environment and connect instead of loading the model.
+    os.environ[EMBEDDING_SOCKET_ENV] = socket_path
+    return process
 
 
 def main() -> None:
@@ -23,12 +44,24 @@ def main() -> None:
     parser.add_argument(
         "--reload", action="store_true", help="Enable auto-reload for development"
     )
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument(
+        "--embedding-socket",
+        help="Run one embedding server on this Unix socket shared by all workers",
+    )
     args = parser.parse_args()
 
-    if args.reload:
-        uvicorn.run("api.app:app", host=args.host, port=args.port, reload=True)
-    else:
-        uvicorn.run(app, host=args.host, port=args.port)
+    embedding_server = start_embedding_server(args.embedding_socket) if args.embedding_socket else None
+    try:
+        if args.reload:
+            uvicorn.run("api.app:app", host=args.host, port=args.port, reload=True)
+        elif args.workers > 1:
+            uvicorn.run("api.app:app", host=args.host, port=args.port, workers=args.workers)
+        else:
+            uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        if embedding_server is not None:
+            embedding_server.terminate()
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from ai.model_manager import ModelManager
@@ -35,6 +36,98 @@ def test_select_specific_model(monkeypatch):
     assert manager.generate("sup").startswith("[Ollama]")
 
 
+def test_ollama_stream_parses_ndjson_incrementally(monkeypatch):
+    lines = [
+        b'{"response": "Hel", "done": false}',
+        b"",
+        b'{"response": "lo", "done": false}',
+        b'{"response": "", "done": true}',
+        b'{"response": "ignored"}',
+    ]
+    calls = []
+
+    class StreamingResp:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            yield from lines
+
+    def fake_post(session, url, json=None, **kwargs):
+        calls.append((json, kwargs))
+        return StreamingResp()
+
+    monkeypatch.setattr(__import__("requests").Session, "post", fake_post)
+    assert list(OllamaModel().stream("hi")) == ["Hel", "lo"]
+    assert calls[0][0]["stream"] is True and calls[0][1]["stream"] is True
+    assert list(OpenAIModel().stream("hi")) == ["[OpenAI] Response to: hi"]
+
+
+def test_ollama_reuses_pooled_connections():
+    import asyncio
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from ai.models.ollama_model import aclose_clients, close_clients
+
+    requests_seen = []
+
+    class FakeOllama(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests_seen.append((self.client_address[1], payload))
+            if payload.get("stream"):
+                lines = [{"response": "Hel"}, {"response": "lo"}, {"response": "", "done": True}]
+                body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            else:
+                body = json.dumps({"response": f"echo {payload.get('prompt', '')}", "done": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        model = OllamaModel(base_url=base_url, pool_size=2, keep_alive="30m")
+        assert model.warm_up()
+        assert "prompt" not in requests_seen[0][1] and requests_seen[0][1]["keep_alive"] == "30m"
+        # A new instance (one per chat request) shares the same pool.
+        assert OllamaModel(base_url=base_url, pool_size=2).generate("a") == "echo a"
+        assert list(model.stream("b")) == ["Hel", "lo"]
+        assert model.generate("c") == "echo c"
+        assert len({port for port, _ in requests_seen}) == 1
+
+        async def run_async():
+            try:
+                first = await model.agenerate("d")
+                fragments = [f async for f in model.astream("e")]
+                return first, fragments
+            finally:
+                await aclose_clients()
+
+        requests_seen.clear()
+        assert asyncio.run(run_async()) == ("echo d", ["Hel", "lo"])
+        assert len({port for port, _ in requests_seen}) == 1
+    finally:
+        close_clients()
+        server.shutdown()
+        server.server_close()
+
+
 def test_invalid_model(monkeypatch):
     monkeypatch.setitem(tenant_config.TENANT_CONFIGS, "bad", {"model": "unknown"})
     with pytest.raises(ValueError):
@@ -50,10 +143,282 @@ def test_response_generator_with_history(monkeypatch):
         def json(self):
             return {"response": "ok"}
 
-    monkeypatch.setattr(__import__("requests"), "post", lambda *a, **k: DummyResp())
+    monkeypatch.setattr(__import__("requests").Session, "post", lambda *a, **k: DummyResp())
 
     gen = ResponseGenerator("t1")
     gen.rag.store.add_document("d1", "info", {"source": "test"})
 
     reply = gen.generate_response("info?", [{"role": "user", "text": "hi"}])
     assert reply == "ok"
+
+
+def test_embedding_model_registry_loads_once_and_serializes_calls():
+    import threading
+    import time
+
+    from ai.embeddings import EmbeddingModelRegistry
+
+    loads = []
+    active = []
+    overlaps = []
+
+    def factory():
+        loads.append(1)
+        time.sleep(0.01)
+
+        def embed(input):
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.001)
+            active.pop()
+            return [[float(len(text))] for text in input]
+
+        return embed
+
+    key = ("test-model", "cpu")
+    EmbeddingModelRegistry.clear()
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(EmbeddingModelRegistry.get(key, factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+    calls = [threading.Thread(target=models[0], args=(["ab", "c"],)) for _ in range(8)]
+    for thread in calls:
+        thread.start()
+    for thread in calls:
+        thread.join()
+    assert max(overlaps) == 1
+    assert models[0](["abc"]) == [[3.0]]
+    EmbeddingModelRegistry.clear()
+
+
+@pytest.mark.parametrize(
+    "embedder_cls",
+    ["LocalEmbeddings", "OpenAIEmbeddings", "HuggingFaceEmbeddings"],
+)
+def test_embedding_cache_only_computes_new_texts(tmp_path, embedder_cls):
+    from ai import embeddings
+    from ai.embeddings import EmbeddingCache
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+    embedder = getattr(embeddings, embedder_cls)(dimension=4, cache=cache)
+    plain = getattr(embeddings, embedder_cls)(dimension=4)
+    computed = []
+    original = embedder._embed
+    embedder._embed = lambda texts: computed.append(list(texts)) or original(texts)
+
+    first = embedder.embed(["a", "b", "a"])
+    assert computed == [["a", "b"]]
+    assert np.allclose(first, plain.embed(["a", "b", "a"]))
+
+    embedder.embed(iter(["b", "c"]))
+    assert computed == [["a", "b"], ["c"]]
+    assert len(cache) == 3
+
+    # Another dimension is a different cache key.
+    reopened = getattr(embeddings, embedder_cls)(dimension=2, cache=EmbeddingCache(tmp_path / "cache.sqlite3"))
+    assert np.allclose(reopened.embed(["a"]), [plain.embed(["a"])[0][:2]])
+    assert len(cache) == 4
+
+
+def test_cached_embedding_function_resolves_model_name_lazily(tmp_path):
+    from ai.embeddings import CachedEmbeddingFunction, EmbeddingCache, EmbeddingClient, LocalEmbeddings
+
+    local = LocalEmbeddings(dimension=3)
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+    # Nothing listens on the socket: creating the function must not connect.
+    offline = EmbeddingClient(str(tmp_path / "missing.sock"), timeout=1)
+    embed = CachedEmbeddingFunction(local.embed_array, cache, lambda: offline.model)
+    assert np.allclose(embed(["a"]), local.embed(["a"]))
+    assert len(cache) == 0
+
+    embed.model = lambda: "served-model"
+    embed(["a", "b"])
+    assert embed.model == "served-model" and len(cache) == 2
+
+
+@pytest.mark.parametrize(
+    "embedder_cls",
+    ["LocalEmbeddings", "OpenAIEmbeddings", "HuggingFaceEmbeddings"],
+)
+def test_embed_array_matches_embed(tmp_path, embedder_cls):
+    from ai import embeddings
+    from ai.embeddings import EmbeddingCache
+
+    texts = [f"text {i}" for i in range(10)]
+    embedder = getattr(embeddings, embedder_cls)(dimension=5)
+    expected = np.array(embedder.embed(texts), dtype=np.float32)
+
+    array = embedder.embed_array(texts, chunk_size=3)
+    assert array.dtype == np.float32 and array.flags.c_contiguous
+    assert np.allclose(array, expected)
+    assert np.allclose(embedder.embed_array((t for t in texts), chunk_size=4), expected)
+
+    cached = getattr(embeddings, embedder_cls)(dimension=5, cache=EmbeddingCache(tmp_path / "c.sqlite3"))
+    assert np.allclose(cached.embed_array(texts, chunk_size=4), expected)
+    assert np.allclose(cached.embed_array(texts), expected)
+
+
+def test_hashing_embeddings_rank_related_text_closer():
+    from ai.embeddings import HashingEmbeddings
+
+    corpus = [
+        "the invoice was paid by bank transfer",
+        "the customer paid the invoice late",
+        "the weather is sunny in the mountains",
+    ]
+    embedder = HashingEmbeddings(dimension=1024).fit(corpus)
+    query, related, unrelated = embedder.embed_array(["invoices paid", corpus[0], corpus[2]])
+    assert query @ related > query @ unrelated
+    assert np.allclose(np.linalg.norm(embedder.embed_array(corpus), axis=1), 1.0)
+
+    # Deterministic across instances; sparse and dense outputs agree.
+    other = HashingEmbeddings(dimension=1024).fit(corpus)
+    assert np.array_equal(other.embed_array(corpus, chunk_size=2), embedder.embed_array(corpus))
+    (indices, values), = embedder.embed_sparse([corpus[1]])
+    dense = np.zeros(1024, dtype=np.float32)
+    dense[indices] = values
+    assert indices.dtype == np.int32 and np.allclose(dense, embedder.embed([corpus[1]])[0])
+    assert embedder.embed_array([""]).shape == (1, 1024)
+
+
+def test_rag_pipeline_adds_embedding_arrays():
+    from ai.embeddings import LocalEmbeddings
+    from ai.rag_pipeline import RAGPipeline
+    from ai.vector_stores import FaissStore
+
+    store = FaissStore()
+    pipeline = RAGPipeline(embedder=LocalEmbeddings(dimension=8), vector_store=store)
+    pipeline.add_documents(["alpha", "beta"], [{"text": "alpha"}, {"text": "beta"}])
+    assert len(store) == 2
+    assert pipeline.retrieve_context("alpha", top_k=1) == "alpha"
+
+
+def test_micro_batcher_merges_concurrent_queries():
+    import threading
+
+    from ai.embeddings import MicroBatcher
+
+    batches = []
+
+    def embed(texts):
+        batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = MicroBatcher(embed, max_batch=8, max_wait=0.05)
+    results = {}
+    barrier = threading.Barrier(12)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.embed(["x" * i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: [[float(i)]] for i in range(12)}
+    assert len(batches) < 12 and max(len(b) for b in batches) <= 8
+    assert batcher.items == 12 and batcher.batches == len(batches)
+
+    failing = MicroBatcher(lambda texts: 1 / 0, max_wait=0)
+    with pytest.raises(ZeroDivisionError):
+        failing.embed(["a"])
+
+
+def test_pipelines_sharing_an_embedder_share_its_batcher():
+    import gc
+    import weakref
+
+    from ai.embeddings import EmbeddingModelRegistry, LocalEmbeddings
+    from ai.rag_pipeline import RAGPipeline
+
+    embedder = LocalEmbeddings(dimension=4)
+    first, second = RAGPipeline(embedder=embedder), RAGPipeline(embedder=embedder)
+    assert first._query_batcher is second._query_batcher
+    assert RAGPipeline()._query_batcher is not first._query_batcher
+    assert first._query_batcher.embed(["a"]) == embedder.embed(["a"])
+
+    batcher = weakref.ref(first._query_batcher)
+    del embedder, first, second
+    gc.collect()
+    assert batcher() is None
+    EmbeddingModelRegistry.clear()
+
+
+@pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"), reason="needs Unix sockets")
+def test_embedding_server_round_trip(tmp_path):
+    import threading
+
+    from ai.embeddings import EmbeddingClient, EmbeddingServer, LocalEmbeddings
+
+    local = LocalEmbeddings(dimension=6)
+    path = str(tmp_path / "embed.sock")
+    server = EmbeddingServer(path, local.embed_array, model="local-6")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = EmbeddingClient(path, timeout=5)
+        texts = ["alpha", "beta", "gamma"]
+        assert np.allclose(client.embed_array(texts), local.embed_array(texts))
+        assert client.model == "local-6"
+        assert np.allclose(client.embed_array(texts), local.embed_array(texts))
+        assert np.allclose(client(texts), local.embed(texts))
+        assert client.embed_array([]).shape[0] == 0
+
+        results = {}
+        workers = [
+            threading.Thread(target=lambda i=i: results.__setitem__(i, client.embed([f"t{i}"])))
+            for i in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(np.allclose(results[i], local.embed([f"t{i}"])) for i in range(8))
+
+        server.batcher.embed_fn = lambda texts: 1 / 0
+        with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+            client.embed(["boom"])
+
+        # A timed-out reply must not be handed to the next request.
+        import time
+
+        def slow(texts):
+            if "slow" in texts:
+                time.sleep(0.3)
+            return local.embed_array(texts)
+
+        server.batcher.embed_fn = slow
+        impatient = EmbeddingClient(path, timeout=0.1)
+        with pytest.raises(OSError):
+            impatient.embed(["slow"])
+        impatient.timeout = 5
+        assert np.allclose(impatient.embed(["fast"]), local.embed(["fast"]))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_hashing_embeddings_save_and_load_keep_idf(tmp_path):
+    from ai.embeddings import HashingEmbeddings
+
+    corpus = ["the invoice was paid", "the customer paid late", "sunny mountains"]
+    embedder = HashingEmbeddings(dimension=256, char_ngrams=None).fit(corpus)
+    embedder.save(tmp_path / "idf.npz")
+    loaded = HashingEmbeddings.load(tmp_path / "idf.npz")
+
+    assert (loaded.dimension, loaded.char_ngrams, loaded.documents) == (256, None, 3)
+    assert loaded.fingerprint == embedder.fingerprint
+    assert loaded.fingerprint != HashingEmbeddings(dimension=256, char_ngrams=None).fingerprint
+    queries = ["invoice paid", "mountains"]
+    assert np.array_equal(loaded.embed_array(queries), embedder.embed_array(queries))
@@ -146,3 +146,115 @@ def test_user_and_file_endpoints(tmp_path, monkeypatch):
     resp = client.get("/files/list", headers=headers_user)
     assert resp.status_code == 200
     assert resp.json()[0]["filename"] == "hello.txt"
+
+
+def test_chat_stream_sends_tokens_and_stores_reply(tmp_path, monkeypatch):
+    import json
+
+    client = setup_client(tmp_path, monkeypatch)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    resp = client.post(
+        "/admin/tenants",
+        json={"tenant_id": "t1", "config": {"model_type": "ollama"}},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    monkeypatch.setattr(
+        routes_chat.ResponseGenerator,
+        "stream_response",
+        lambda self, message, history=None: iter(["Hel", "lo", " there"]),
+    )
+
+    with client.stream(
+        "POST",
+        "/chat/stream",
+        json={"session_id": "s1", "tenant_id": "t1", "message": "hi"},
+        headers=headers,
+    ) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        body = "".join(resp.iter_text())
+
+    events = [block for block in body.split("\n\n") if block]
+    tokens = [json.loads(e[len("data: "):])["token"] for e in events if e.startswith("data: ")]
+    assert tokens == ["[Ollama] Hel", "lo", " there"]
+    assert events[-1] == 'event: done\ndata: {"reply": "[Ollama] Hello there"}'
+
+    history = client.get("/chat/history", params={"session_id": "s1"}, headers=headers).json()["history"]
+    assert len(history) == 2
+    assert "Hello there" in json.dumps(history)
+
+
+def test_warm_up_skips_tenants_with_bad_model_config(tmp_path, monkeypatch):
+    from ai.models.ollama_model import OllamaModel
+
+    setup_client(tmp_path, monkeypatch)
+    tm = routes_chat.tenant_manager
+    tm.create("bad", {"model_type": "ollama", "model_config": {"base_url": 11434}})
+    tm.create("good", {"model_type": "ollama", "model_name": "m1", "model_config": {"keep_alive": "5m"}})
+    tm.create("named", {"model_type": "ollama", "model_name": "m1", "model_config": {"model_name": "m3", "top_k": 4}})
+    tm.create("off", {"model_type": "ollama", "model_name": "m2", "model_config": {"preload": False}})
+    warmed = []
+    monkeypatch.setattr(OllamaModel, "warm_up", lambda self: warmed.append(self.model_name) or True)
+
+    routes_chat.warm_up_models().join(timeout=5)
+    assert sorted(warmed) == ["m1", "m3"]
+
+
+def test_chat_passes_only_ollama_settings_from_model_config(tmp_path, monkeypatch):
+    client = setup_client(tmp_path, monkeypatch)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    config = {
+        "model_type": "ollama",
+        "model_name": "llama3.2",
+        "model_config": {"model_name": "llama3", "temperature": 0.2, "read_timeout": 9.0},
+    }
+    assert client.post("/admin/tenants", json={"tenant_id": "t1", "config": config}, headers=headers).status_code == 200
+    monkeypatch.setattr(
+        routes_chat.ResponseGenerator,
+        "generate_response",
+        lambda self, message, history=None: f"{self.model.model_name} {self.model.read_timeout}",
+    )
+    monkeypatch.setattr(
+        routes_chat.ResponseGenerator,
+        "stream_response",
+        lambda self, message, history=None: iter([self.model.model_name]),
+    )
+
+    body = {"session_id": "s1", "tenant_id": "t1", "message": "hi"}
+    resp = client.post("/chat/message", json=body, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["reply"] == "[Ollama] llama3 9.0"
+    with client.stream("POST", "/chat/stream", json=body, headers=headers) as resp:
+        assert 'event: done\ndata: {"reply": "[Ollama] llama3"}' in "".join(resp.iter_text())
+
+
+def test_chat_stream_stores_reply_once_when_persisting_fails(tmp_path, monkeypatch):
+    import json
+
+    client = setup_client(tmp_path, monkeypatch)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    client.post("/admin/tenants", json={"tenant_id": "t1", "config": {"model_type": "ollama"}}, headers=headers)
+    monkeypatch.setattr(
+        routes_chat.ResponseGenerator,
+        "stream_response",
+        lambda self, message, history=None: iter(["Hel", "lo"]),
+    )
+
+    def fail(username, action, details=None):
+        if action == "chat_stream":
+            raise RuntimeError("audit log unavailable")
+
+    monkeypatch.setattr(routes_chat.audit_log_repository, "log_action", fail)
+    with client.stream(
+        "POST",
+        "/chat/stream",
+        json={"session_id": "s1", "tenant_id": "t1", "message": "hi"},
+        headers=headers,
+    ) as resp:
+        body = "".join(resp.iter_text())
+
+    assert "event: error" in body and "event: done" not in body
+    history = client.get("/chat/history", params={"session_id": "s1"}, headers=headers).json()["history"]
+    assert len(history) == 2
+    assert "[Ollama] Hello" in json.dumps(history)
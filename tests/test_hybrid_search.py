@@ -1,3 +1,5 @@
+import os
+
 from ai.vector_stores.chroma_store import TenantVectorStore
 
 
@@ -9,3 +11,186 @@ def test_tenant_vector_store_hybrid_query_keyword(tmp_path):
     results = store.hybrid_query("2024-05-01", n_results=2)
     docs = results.get("documents", [[]])[0]
     assert "event on 2024-05-01" in docs
+
+
+def test_trigram_index_substring_search(tmp_path):
+    from ai.vector_stores.trigram_index import TrigramIndex
+
+    path = str(tmp_path / "keyword_index.jsonl")
+    index = TrigramIndex(path)
+    index.add("1", "Close on 2024-05-01 was HIGH")
+    index.add("2", "close on 2024-05-02")
+    index.add("3", "volume spike")
+
+    assert index.search("2024-05-0") == ["Close on 2024-05-01 was HIGH", "close on 2024-05-02"]
+    assert index.search("high") == ["Close on 2024-05-01 was HIGH"]
+    assert index.search("e s") == ["volume spike"]
+    assert index.search("lo") == ["Close on 2024-05-01 was HIGH", "close on 2024-05-02"]
+    assert index.search("missing") == []
+
+    index.add("2", "replaced text")
+    reloaded = TrigramIndex(path)
+    assert len(reloaded) == 3
+    assert reloaded.search("2024-05-02") == []
+    assert reloaded.search("replaced") == ["replaced text"]
+
+    # Rows appended by another process are picked up on the next search.
+    index.add("4", "added by a loader")
+    assert reloaded.search("loader") == ["added by a loader"]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('["5", "half written')
+    assert reloaded.search("half") == []
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(' row"]\n')
+    assert reloaded.search("half") == ["half written row"]
+    position, pairs = reloaded.since(0)
+    assert ("5", "half written row") in pairs and reloaded.since(position) == (position, [])
+
+    # A replaced log rebuilds the index.
+    os.remove(path)
+    TrigramIndex(path).add("9", "fresh start")
+    assert reloaded.items() == [("9", "fresh start")] and reloaded.generation == 1
+
+
+def test_bm25_ranks_rare_terms_first():
+    from ai.vector_stores.bm25 import BM25Index
+
+    index = BM25Index()
+    index.add("1", "the market closed higher")
+    index.add("2", "the the the market")
+    index.add("3", "volume on 2024-05-01 was unusual")
+    index.add("4", "the close")
+
+    results = index.search("unusual market", top_k=2)
+    assert [doc_id for doc_id, _ in results] == ["3", "1"]
+    assert index.search("2024-05-01", top_k=5)[0][0] == "3"
+    assert index.search("nothing here") == []
+
+    index.add("3", "replaced")
+    assert index.search("unusual") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    from ai.vector_stores.bm25 import reciprocal_rank_fusion
+
+    lexical = ["a", "b", "c"]
+    semantic = ["c", "d", "a"]
+    assert reciprocal_rank_fusion([lexical, semantic], limit=2) == ["a", "c"]
+    assert reciprocal_rank_fusion([lexical, semantic]) == ["a", "c", "b", "d"]
+
+
+def test_common_word_does_not_crowd_out_semantic_hits(tmp_path):
+    store = TenantVectorStore("tenant", persist_dir=str(tmp_path))
+    for i in range(10):
+        store.add_document(str(i), f"row {i} of the table", {})
+
+    docs = store.hybrid_query("the", n_results=3)["documents"][0]
+    assert len(docs) == 3
+    # The fallback collection ranks documents in insertion order.
+    assert docs[0] == "row 0 of the table"
+    batch = store.hybrid_query_batch(["the"], n_results=3)
+    assert batch[0]["documents"][0] == docs
+
+
+def test_add_documents_writes_in_batches(tmp_path):
+    store = TenantVectorStore("tenant", persist_dir=str(tmp_path))
+    calls = []
+    original_add = store.collection.add
+
+    def counting_add(ids, documents, metadatas):
+        calls.append(list(ids))
+        original_add(ids=ids, documents=documents, metadatas=metadatas)
+
+    store.collection.add = counting_add
+    progress = []
+    texts = [f"row {i} close 10{i}" for i in range(5)]
+    store.add_documents([f"r{i}" for i in range(5)], texts, batch_size=2, progress=lambda *p: progress.append(p))
+
+    assert calls == [["r0", "r1"], ["r2", "r3"], ["r4"]]
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    assert store.keyword_search("close 103") == ["row 3 close 103"]
+
+
+def test_hybrid_query_cache_hits_and_version_invalidation(tmp_path):
+    from ai.vector_stores import RetrievalCache
+
+    now = [0.0]
+    cache = RetrievalCache(ttl=60, clock=lambda: now[0])
+    store = TenantVectorStore("tenant", persist_dir=str(tmp_path), cache=cache)
+    store.add_document("1", "close on 2024-05-01", {})
+    semantic_calls = []
+    original_query = store.query
+    store.query = lambda text, n: semantic_calls.append(text) or original_query(text, n)
+
+    first = store.hybrid_query("Close  on 2024-05-01", n_results=2)
+    assert store.hybrid_query("close on 2024-05-01", n_results=2) == first
+    assert len(semantic_calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    store.add_document("2", "close on 2024-05-02", {})
+    second = store.hybrid_query("close on 2024-05-01", n_results=2)
+    assert "close on 2024-05-02" in second["documents"][0]
+    assert len(semantic_calls) == 2
+
+    now[0] = 61  # entries expire after the TTL
+    store.hybrid_query("close on 2024-05-01", n_results=2)
+    assert len(semantic_calls) == 3
+    assert cache.stats()["hits"] == 1
+
+
+def test_only_documents_go_through_the_embedding_cache(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from ai.embeddings import EmbeddingModelRegistry, LocalEmbeddings
+    from ai.vector_stores import chroma_store
+
+    class FakeCollection:
+        def __init__(self, embedding_function):
+            self.embedding_function = embedding_function
+            self.rows = {}
+
+        def add(self, ids, documents, metadatas, embeddings=None):
+            embeddings = embeddings if embeddings is not None else self.embedding_function(documents)
+            self.rows.update(zip(ids, zip(documents, embeddings)))
+
+        def query(self, query_texts, n_results=3):
+            self.embedding_function(query_texts)
+            return {"documents": [[doc for doc, _ in self.rows.values()][:n_results] for _ in query_texts]}
+
+        def get(self, include=None):
+            return {"ids": list(self.rows), "documents": [doc for doc, _ in self.rows.values()]}
+
+    class FakeClient:
+        def __init__(self, path):
+            self.path = path
+
+        def get_or_create_collection(self, name, embedding_function):
+            return FakeCollection(embedding_function)
+
+    embed = LocalEmbeddings(dimension=4)
+    chromadb = SimpleNamespace(PersistentClient=FakeClient)
+    functions = SimpleNamespace(SentenceTransformerEmbeddingFunction=lambda model_name, device: embed.embed)
+    monkeypatch.delenv("SMARTBASE_EMBEDDING_SOCKET", raising=False)
+    monkeypatch.setattr(chroma_store, "_chromadb", lambda: (chromadb, functions))
+    monkeypatch.setattr(chroma_store, "_torch", lambda: None)
+    try:
+        store = chroma_store.TenantVectorStore("tenant", persist_dir=str(tmp_path))
+        store.add_documents(["1", "2"], ["alpha", "beta"], [{}, {}])
+        assert len(store.embedding_fn.cache) == 2
+        assert store.hybrid_query("a new question", n_results=2)["documents"][0]
+        store.query_batch(["another question", "and one more"])
+        assert len(store.embedding_fn.cache) == 2
+    finally:
+        EmbeddingModelRegistry.clear()
+
+
+def test_bm25_keeps_ids_and_follows_the_keyword_log(tmp_path):
+    store = TenantVectorStore("tenant", persist_dir=str(tmp_path))
+    store.add_documents(["1", "2"], ["alpha report", "beta summary"], [{}, {}])
+    assert not hasattr(store.bm25, "_texts")
+    assert store.bm25.search("alpha")[0][0] == "1"
+
+    store.add_document("1", "gamma report", {})
+    docs = store.hybrid_query("gamma", n_results=1)["documents"][0]
+    assert docs == ["gamma report"]
+    assert store.bm25.search("alpha") == []
@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Generous wall-clock budget; the module check below is the strict guard.
+IMPORT_BUDGET_SECONDS = 3.0
+HEAVY_MODULES = ("chromadb", "torch", "sentence_transformers")
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import api.app
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def test_import_api_app_stays_light():
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS
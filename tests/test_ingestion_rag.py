@@ -72,7 +72,7 @@ def test_response_generator_rag_integration(monkeypatch):
         def json(self):
             return {"response": "done"}
 
-    monkeypatch.setattr(__import__("requests"), "post", lambda *a, **k: DummyResp())
+    monkeypatch.setattr(__import__("requests").Session, "post", lambda *a, **k: DummyResp())
 
     gen = ResponseGenerator("rag")
     gen.rag.store.add_document("d", "foo", {"meta": "t"})
@@ -91,12 +91,12 @@ def test_response_generator_includes_retrieved_context(monkeypatch):
         def json(self):
             return {"response": "ok"}
 
-    def fake_post(url, *_, **kwargs):
+    def fake_post(session, url, *_, **kwargs):
         payload = kwargs.get("json", {})
         captured["prompt"] = payload.get("prompt", "")
         return DummyResp()
 
-    monkeypatch.setattr(__import__("requests"), "post", fake_post)
+    monkeypatch.setattr(__import__("requests").Session, "post", fake_post)
 
     gen = ResponseGenerator("ctx")
     gen.rag.store.add_document("d", "Dan is 186 cm tall", {"source": "t"})
@@ -105,3 +105,15 @@ def test_response_generator_includes_retrieved_context(monkeypatch):
     assert "186 cm" in captured["prompt"]
 
 
+def test_rag_pipeline_retrieve_context_batch():
+    pipeline = RAGPipeline(
+        embedder=LocalEmbeddings(),
+        vector_store=FaissStore(),
+        model=OpenAIModel(),
+    )
+    texts = ["alpha", "beta", "gamma"]
+    pipeline.add_documents(texts, [{"text": t} for t in texts])
+
+    contexts = pipeline.retrieve_context_batch(["gamma", "alpha"], top_k=1)
+    assert contexts == ["gamma", "alpha"]
+    assert contexts == [pipeline.retrieve_context(q, top_k=1) for q in ["gamma", "alpha"]]
@@ -26,3 +26,111 @@ def test_create_existing_tenant(tmp_path, monkeypatch):
     manager.create("t1", {})
     with pytest.raises(ValueError):
         manager.create("t1", {})
+
+
+def test_tenant_store_cache_lru_idle_and_invalidate():
+    from ai.vector_stores import TenantStoreCache
+
+    now = [0.0]
+    opened = []
+
+    def factory(tenant_id, persist_dir):
+        opened.append(tenant_id)
+        return object()
+
+    cache = TenantStoreCache(max_size=2, idle_timeout=60, factory=factory, clock=lambda: now[0])
+    a = cache.get("a")
+    assert cache.get("a") is a
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # evicts "b", the least recently used
+    assert opened == ["a", "b", "c"]
+    assert "b" not in cache and "a" in cache
+
+    now[0] = 30
+    cache.get("a")
+    now[0] = 70  # "c" has been idle for 70s, "a" for 40s
+    cache.get("a")
+    assert "c" not in cache and len(cache) == 1
+
+    cache.invalidate("a")
+    assert cache.get("a") is not a
+    assert opened == ["a", "b", "c", "a"]
+
+
+def test_tenant_store_cache_closes_dropped_stores():
+    from ai.vector_stores import TenantStoreCache
+
+    now = [0.0]
+    closed = []
+
+    class Store:
+        def __init__(self, tenant_id, persist_dir):
+            self.tenant_id = tenant_id
+            self.stale = False
+
+        def is_stale(self):
+            return self.stale
+
+        def close(self):
+            closed.append(self.tenant_id)
+
+    cache = TenantStoreCache(max_size=2, idle_timeout=60, factory=Store, clock=lambda: now[0])
+    cache.get("a")
+    cache.get("b")
+    cache.get("c")  # evicts "a"
+    assert closed == ["a"]
+    cache.get("b").stale = True
+    cache.get("b")
+    assert closed == ["a", "b"]
+    now[0] = 100
+    cache.get("d")  # "b" and "c" were idle
+    assert sorted(closed) == ["a", "b", "b", "c"]
+    cache.invalidate("d")
+    assert closed[-1] == "d"
+    cache.get("e")
+    cache.clear()
+    assert closed[-1] == "e" and len(cache) == 0
+
+
+def test_tenant_store_cache_invalidate_drops_cached_results(tmp_path):
+    from ai.vector_stores import TenantStoreCache, retrieval_cache
+
+    cache = TenantStoreCache()
+    store = cache.get("t1", persist_dir=str(tmp_path))
+    store.add_document("d1", "old tenant data")
+    assert store.hybrid_query("old", n_results=1)["documents"][0] == ["old tenant data"]
+    assert retrieval_cache.get(store.persist_path, ("old", 1)) is not None
+
+    cache.invalidate("t1")
+    assert retrieval_cache.get(store.persist_path, ("old", 1)) is None
+    version = retrieval_cache.version("vector_store/t2")
+    cache.invalidate("t2")  # not open in this process
+    assert retrieval_cache.version("vector_store/t2") == version + 1
+
+
+def test_tenant_store_cache_reopens_stores_rebuilt_on_disk(tmp_path):
+    import os
+    import shutil
+
+    from ai.vector_stores import RetrievalCache, TenantStoreCache, TenantVectorStore
+
+    results = RetrievalCache()
+    cache = TenantStoreCache(
+        factory=lambda tenant_id, persist_dir: TenantVectorStore(tenant_id, persist_dir, cache=results)
+    )
+    store = cache.get("t1", persist_dir=str(tmp_path))
+    store.add_document("d1", "first load")
+    assert cache.get("t1", persist_dir=str(tmp_path)) is store
+    version = results.version(store.persist_path)
+
+    # A loader script in another process deletes and rebuilds the tenant.
+    shutil.rmtree(store.persist_path)
+    os.makedirs(store.persist_path)
+    with open(os.path.join(store.persist_path, "keyword_index.jsonl"), "w", encoding="utf-8") as f:
+        f.write('["row1", "second load"]\n')
+
+    reopened = cache.get("t1", persist_dir=str(tmp_path))
+    assert reopened is not store
+    assert results.version(store.persist_path) > version
+    assert cache.get("t1", persist_dir=str(tmp_path)) is reopened
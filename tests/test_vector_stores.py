@@ -0,0 +1,494 @@
+import numpy as np
+import pytest
+
+from ai.vector_stores import FaissStore, ChromaStore, PineconeStore
+from ai.vector_stores.matrix import VectorMatrix, top_k_smallest
+
+
+def _random_data(n=200, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_vector_matrix_grows_by_doubling():
+    matrix = VectorMatrix(capacity=2)
+    for i in range(5):
+        matrix.append([float(i), 0.0])
+    assert len(matrix) == 5
+    assert matrix._data.shape[0] == 8
+    assert matrix.array[:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert matrix.sq_norms.tolist() == [0.0, 1.0, 4.0, 9.0, 16.0]
+
+    with pytest.raises(ValueError):
+        matrix.append([1.0, 2.0, 3.0])
+
+
+def test_top_k_smallest_matches_full_sort():
+    scores = np.array([5.0, 1.0, 4.0, 0.5, 3.0])
+    assert top_k_smallest(scores, 3).tolist() == [3, 1, 4]
+    assert top_k_smallest(scores, 10).tolist() == [3, 1, 4, 2, 0]
+
+
+@pytest.mark.parametrize("store_cls", [FaissStore, ChromaStore, PineconeStore])
+def test_query_matches_brute_force(store_cls):
+    data = _random_data()
+    store = store_cls()
+    store.add(data, [{"id": i} for i in range(len(data))])
+
+    query = data[17] + 0.01
+    results = store.query(query.tolist(), top_k=5)
+
+    expected = np.argsort(((data - query) ** 2).sum(axis=1))[:5]
+    assert [meta["id"] for meta, _ in results] == expected.tolist()
+    assert results[0][1] == pytest.approx(float(((data[17] - query) ** 2).sum()), abs=1e-4)
+
+
+def test_query_empty_store():
+    assert FaissStore().query([0.0, 1.0]) == []
+
+
+def test_ivf_index_query_and_recall_report():
+    data = _random_data(n=2000, dim=16, seed=1)
+    store = FaissStore(index="ivf", nlist=32, nprobe=4)
+    store.add(data[:1500], [{"id": i} for i in range(1500)])
+
+    # Untrained IVF falls back to the exact scan.
+    assert store.query(data[3], top_k=1)[0][0]["id"] == 3
+
+    store.train()
+    store.add(data[1500:], [{"id": i} for i in range(1500, 2000)])
+    assert store.query(data[1800], top_k=1)[0][0]["id"] == 1800
+
+    report = store.recall_report(data[:50], top_k=10, values=[1, 4, 32])
+    assert report[32] == pytest.approx(1.0)
+    assert report[1] <= report[4] <= report[32]
+    with pytest.raises(ValueError, match="'nprobe'"):
+        store.recall_report(data[:5], param="ef_search")
+    with pytest.raises(ValueError, match="trained index"):
+        FaissStore().recall_report(data[:5])
+
+
+def test_unknown_index_type():
+    with pytest.raises(ValueError):
+        FaissStore(index="unknown")
+
+
+@pytest.mark.parametrize("store_cls", [FaissStore, PineconeStore])
+def test_hnsw_incremental_inserts_and_recall(store_cls):
+    data = _random_data(n=600, dim=12, seed=2)
+    store = store_cls(index="hnsw", M=8, ef_construction=64, ef_search=32)
+    for i, vec in enumerate(data):
+        store.add([vec], [{"id": i}])
+
+    assert store.query(data[42], top_k=1)[0][0]["id"] == 42
+    report = store.recall_report(data[:30], top_k=10, param="ef_search", values=[10, 100])
+    assert report[100] >= 0.95
+    assert report[10] <= report[100]
+
+
+def test_hnsw_save_and_load(tmp_path):
+    from ai.vector_stores.hnsw_index import HNSWIndex
+
+    data = _random_data(n=300, dim=8, seed=3)
+    store = FaissStore(index="hnsw", M=8, ef_construction=32)
+    store.add(data[:200], [{"id": i} for i in range(200)])
+    store._index.save(tmp_path / "graph.npz")
+
+    loaded = HNSWIndex.load(tmp_path / "graph.npz")
+    ids, _ = loaded.search(store._vectors, data[7], top_k=3)
+    expected, _ = store._index.search(store._vectors, data[7], top_k=3)
+    assert ids.tolist() == expected.tolist()
+
+    store._index = loaded
+    store.add(data[200:], [{"id": i} for i in range(200, 300)])
+    assert store.query(data[250], top_k=1)[0][0]["id"] == 250
+
+
+@pytest.mark.parametrize(
+    "quantization, params",
+    [("sq8", {}), ("pq", {"m": 8, "nbits": 6})],
+)
+def test_quantized_storage_rerank(tmp_path, quantization, params):
+    data = _random_data(n=1000, dim=32, seed=4)
+    store = FaissStore(
+        quantization=quantization,
+        quantization_params=params,
+        rerank=8,
+        vector_path=str(tmp_path / "vectors.f32"),
+    )
+    store.add(data[:800], [{"id": i} for i in range(800)])
+    store.train()
+    store.add(data[800:], [{"id": i} for i in range(800, 1000)])
+
+    assert len(store._codes) == 1000
+    assert store.memory_usage < data.nbytes / 2
+
+    results = store.query(data[900], top_k=3)
+    assert results[0][0]["id"] == 900
+    assert results[0][1] == pytest.approx(0.0, abs=1e-4)
+
+    report = store.recall_report(data[:20], top_k=10, param="rerank", values=[1, 10])
+    assert report[10] >= 0.9
+    with pytest.raises(ValueError, match="'rerank'"):
+        store.recall_report(data[:5], param="nprobe")
+
+
+def test_product_quantizer_requires_divisible_dimension():
+    from ai.vector_stores.quantization import ProductQuantizer
+
+    with pytest.raises(ValueError):
+        ProductQuantizer(m=5).train(_random_data(n=50, dim=8))
+
+
+def test_save_and_load_memory_mapped(tmp_path):
+    data = _random_data(n=100, dim=8, seed=5)
+    store = PineconeStore()
+    store.add(data, [{"id": i, "text": f"doc {i}"} for i in range(100)])
+    path = tmp_path / "store.sbvs"
+    store.save(path)
+
+    loaded = PineconeStore.load(path, mmap=True)
+    assert len(loaded) == 100
+    assert loaded.query(data[10], top_k=1)[0][0] == {"id": 10, "text": "doc 10"}
+
+    # Appending after an mmap load copies into memory and leaves the file intact.
+    loaded.add([data[0] + 5.0], [{"id": 100}])
+    assert loaded.query(data[0] + 5.0, top_k=1)[0][0]["id"] == 100
+    assert len(PineconeStore.load(path, mmap=False)) == 100
+
+
+def test_load_restores_hnsw_graph(tmp_path):
+    data = _random_data(n=150, dim=8, seed=6)
+    store = FaissStore(index="hnsw", M=8, ef_construction=32)
+    store.add(data, [{"id": i} for i in range(150)])
+    store.save(tmp_path / "store.sbvs")
+
+    loaded = FaissStore.load(tmp_path / "store.sbvs", index="hnsw", M=8)
+    assert len(loaded._index) == 150
+    assert loaded.query(data[77], top_k=1)[0][0]["id"] == 77
+
+
+def test_load_rejects_unknown_format(tmp_path):
+    path = tmp_path / "bogus.sbvs"
+    path.write_bytes(b"not a store" * 10)
+    with pytest.raises(ValueError):
+        FaissStore.load(path)
+
+
+def test_query_batch_matches_single_queries():
+    data = _random_data(n=300, dim=8, seed=7)
+    store = FaissStore()
+    store.add(data, [{"id": i} for i in range(300)])
+    store.BATCH_SCORE_LIMIT = 1000  # force several chunks
+
+    queries = data[:10] + 0.05
+    batched = store.query_batch(queries, top_k=4)
+    assert len(batched) == 10
+    for query, results in zip(queries, batched):
+        single = store.query(query, top_k=4)
+        assert [m["id"] for m, _ in results] == [m["id"] for m, _ in single]
+        assert [d for _, d in results] == pytest.approx([d for _, d in single], abs=1e-4)
+
+    assert store.query_batch([], top_k=3) == []
+
+
+def _filtered_store(**kwargs):
+    data = _random_data(n=400, dim=8, seed=8)
+    store = FaissStore(**kwargs)
+    metadata = [
+        {"id": i, "source": f"file{i % 4}.csv", "date": f"2024-01-{i % 28 + 1:02d}"}
+        for i in range(400)
+    ]
+    store.add(data, metadata)
+    return store, data
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"index": "hnsw", "M": 8, "ef_construction": 32}])
+def test_query_with_where_filter(kwargs):
+    store, data = _filtered_store(**kwargs)
+
+    results = store.query(data[5], top_k=5, where={"source": "file1.csv"})
+    assert len(results) == 5
+    assert results[0][0]["id"] == 5
+    assert all(meta["source"] == "file1.csv" for meta, _ in results)
+
+    results = store.query(
+        data[0], top_k=50, where={"source": {"$in": ["file0.csv", "file2.csv"]}, "date": {"$gte": "2024-01-20"}}
+    )
+    assert results
+    for meta, _ in results:
+        assert meta["source"] in ("file0.csv", "file2.csv")
+        assert meta["date"] >= "2024-01-20"
+
+    assert store.query(data[0], top_k=3, where={"source": "missing.csv"}) == []
+
+
+def test_query_batch_with_where_filter():
+    store, data = _filtered_store()
+    batched = store.query_batch(data[:3], top_k=4, where={"source": {"$ne": "file0.csv"}})
+    for results in batched:
+        assert all(meta["source"] != "file0.csv" for meta, _ in results)
+    assert batched[1][0][0]["id"] == 1
+
+
+def test_where_filter_after_load(tmp_path):
+    store, data = _filtered_store()
+    store.save(tmp_path / "store.sbvs")
+    loaded = FaissStore.load(tmp_path / "store.sbvs")
+    results = loaded.query(data[6], top_k=2, where={"source": "file2.csv"})
+    assert [meta["id"] for meta, _ in results][0] == 6
+
+
+def test_unsupported_filter_operator():
+    store, data = _filtered_store()
+    with pytest.raises(ValueError):
+        store.query(data[0], where={"source": {"$regex": "file"}})
+
+
+def test_upsert_and_delete_by_id():
+    data = _random_data(n=50, dim=8, seed=9)
+    store = FaissStore(compaction_threshold=None)
+    ids = [f"doc{i}" for i in range(50)]
+    store.upsert(ids, data, [{"id": i} for i in range(50)])
+
+    # Replacing doc3 hides the old vector and returns the new metadata.
+    store.upsert(["doc3"], [data[40] + 0.001], [{"id": 3, "version": 2}])
+    assert len(store) == 50
+    assert store.query(data[3], top_k=1)[0][0]["id"] != 3
+    assert store.query(data[40], top_k=2)[1][0] == {"id": 3, "version": 2}
+
+    assert store.delete(["doc5", "doc6", "missing"]) == 2
+    assert len(store) == 48
+    found = [meta["id"] for meta, _ in store.query(data[5], top_k=48)]
+    assert 5 not in found and 6 not in found
+    assert [r[0]["id"] for r in store.query_batch([data[5]], top_k=48)[0]] == found
+
+    store.compact()
+    assert len(store._metadata) == 48
+    assert [meta["id"] for meta, _ in store.query(data[5], top_k=48)] == found
+    store.upsert(["doc7"], [data[7]], [{"id": 7, "version": 2}])
+    assert store.query(data[7], top_k=1)[0][0] == {"id": 7, "version": 2}
+
+
+def test_background_compaction_with_concurrent_queries():
+    import threading
+
+    data = _random_data(n=400, dim=8, seed=10)
+    store = FaissStore(index="hnsw", M=8, ef_construction=32, compaction_threshold=0.25)
+    store.add(data, [{"id": i} for i in range(400)], ids=list(range(400)))
+
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for meta, _ in store.query(data[0], top_k=5):
+                    assert meta["id"] % 2 == 0 or meta["id"] >= 200
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+    store.delete([i for i in range(200) if i % 2])
+    assert store._compaction_thread is not None
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    store._compaction_thread.join()
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(store._metadata) == 300 and not store._deleted
+    assert store.query(data[250], top_k=1)[0][0]["id"] == 250
+
+
+def test_save_skips_tombstones_and_keeps_ids(tmp_path):
+    data = _random_data(n=20, dim=4, seed=11)
+    store = FaissStore(compaction_threshold=None)
+    store.upsert([f"d{i}" for i in range(20)], data, [{"id": i} for i in range(20)])
+    store.delete(["d0"])
+    store.save(tmp_path / "store.sbvs")
+
+    loaded = FaissStore.load(tmp_path / "store.sbvs")
+    assert len(loaded) == 19
+    assert loaded.delete(["d1"]) == 1
+    assert 1 not in [meta["id"] for meta, _ in loaded.query(data[1], top_k=19)]
+
+
+def test_empty_store_round_trip_accepts_new_rows(tmp_path):
+    FaissStore().save(tmp_path / "empty.sbvs")
+    loaded = FaissStore.load(tmp_path / "empty.sbvs")
+    assert len(loaded) == 0 and loaded.query([1.0, 0.0]) == []
+    loaded.add([[1.0, 0.0], [0.0, 1.0]], [{"id": 0}, {"id": 1}])
+    assert loaded.query([0.0, 1.0], top_k=1)[0][0]["id"] == 1
+
+
+def test_save_with_tombstones_drops_stale_hnsw_graph(tmp_path):
+    data = _random_data(n=100, dim=4, seed=12)
+    path = tmp_path / "store.sbvs"
+    store = FaissStore(index="hnsw", compaction_threshold=None)
+    store.upsert(range(100), data, [{"id": i} for i in range(100)])
+    store.save(path)
+    assert (tmp_path / "store.sbvs.hnsw.npz").exists()
+
+    store.delete(range(50))
+    store.save(path)
+    assert not (tmp_path / "store.sbvs.hnsw.npz").exists()
+    loaded = FaissStore.load(path, index="hnsw")
+    assert len(loaded._index) == 50
+    assert loaded.query(data[94], top_k=1)[0][0]["id"] == 94
+
+
+@pytest.mark.parametrize("metric", ["cosine", "ip"])
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"index": "hnsw"}, {"index": "ivf", "nlist": 8, "nprobe": 8}, {"quantization": "sq8", "rerank": 8}],
+)
+def test_cosine_and_inner_product_metrics(metric, kwargs):
+    data = _random_data(n=300, dim=8, seed=5)
+    store = FaissStore(metric=metric, **kwargs)
+    store.add(data, [{"id": i} for i in range(len(data))])
+    store.train()
+
+    query = data[42] * 3.0
+    unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+    if metric == "cosine":
+        scores = 1.0 - unit @ (query / np.linalg.norm(query))
+    else:
+        scores = -(data @ query)
+    expected = np.argsort(scores)[:5].tolist()
+
+    results = store.query(query, top_k=5)
+    assert [meta["id"] for meta, _ in results] == expected
+    assert results[0][1] == pytest.approx(float(scores[expected[0]]), abs=1e-3)
+    batch = store.query_batch([query], top_k=5)
+    assert [meta["id"] for meta, _ in batch[0]] == expected
+
+
+def test_metric_is_saved_with_the_store(tmp_path):
+    data = _random_data(seed=6)
+    store = FaissStore(metric="cosine")
+    store.add(data, [{"id": i} for i in range(len(data))])
+    path = tmp_path / "store.sbvs"
+    store.save(path)
+
+    loaded = FaissStore.load(path)
+    assert loaded.metric == "cosine"
+    assert loaded.query(data[9] * 2.0, top_k=1)[0][0]["id"] == 9
+    with pytest.raises(ValueError):
+        FaissStore.load(path, metric="l2")
+    with pytest.raises(ValueError):
+        FaissStore(metric="manhattan")
+
+
+def test_sharded_store_matches_single_store(tmp_path):
+    from ai.vector_stores import ShardedStore
+
+    data = _random_data(n=400, dim=8, seed=7)
+    meta = [{"id": i, "even": i % 2 == 0} for i in range(len(data))]
+    single = FaissStore()
+    single.add(data, meta, ids=range(len(data)))
+    with ShardedStore(num_shards=3) as sharded:
+        sharded.add(data, meta, ids=range(len(data)))
+        assert len(sharded) == 400
+
+        queries = data[:5] + 0.01
+        for query in queries:
+            assert sharded.query(query, top_k=7) == single.query(query, top_k=7)
+        assert sharded.query_batch(queries, top_k=7) == single.query_batch(queries, top_k=7)
+        assert all(meta["even"] for meta, _ in sharded.query(data[1], top_k=5, where={"even": True}))
+
+        assert sharded.delete([0, 1, 999]) == 2
+        assert sharded.query(data[0], top_k=1)[0][0]["id"] != 0
+        sharded.save(tmp_path / "shards")
+
+    with ShardedStore.load(tmp_path / "shards") as loaded:
+        assert loaded.num_shards == 3
+        assert len(loaded) == 398
+        assert loaded.query(data[10], top_k=1)[0][0]["id"] == 10
+
+
+def test_sharded_store_concurrent_calls_and_worker_failure():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ai.vector_stores import ShardedStore
+
+    data = _random_data(n=200, dim=8, seed=9)
+    meta = [{"id": i} for i in range(len(data))]
+    single = FaissStore()
+    single.add(data, meta)
+    with ShardedStore(num_shards=2) as sharded:
+        sharded.add(data, meta)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda q: sharded.query(q, top_k=3), data[:64]))
+        assert results == [single.query(q, top_k=3) for q in data[:64]]
+
+        # Worker exceptions come back as their type and message.
+        with pytest.raises(ValueError, match="dimension"):
+            sharded.add(np.ones((1, 3), dtype=np.float32), [{}])
+
+        sharded._workers[1].terminate()
+        sharded._workers[1].join()
+        with pytest.raises(RuntimeError, match="broken"):
+            sharded.query(data[0], top_k=3)
+        with pytest.raises(RuntimeError, match="broken"):
+            len(sharded)
+
+
+@pytest.mark.parametrize("metric", ["ip", "cosine", "l2"])
+def test_sparse_store_matches_dense_scoring(metric):
+    from ai.vector_stores import SparseVectorStore
+
+    rng = np.random.default_rng(8)
+    data = _random_data(n=120, dim=64, seed=8)
+    data[rng.random(data.shape) < 0.9] = 0.0
+    dense = FaissStore(metric=metric)
+    dense.add(data, [{"id": i} for i in range(len(data))])
+    store = SparseVectorStore(metric=metric)
+    rows = [(np.flatnonzero(row), row[np.flatnonzero(row)]) for row in data]
+    store.add(rows, [{"id": i} for i in range(len(data))], ids=range(len(data)))
+    assert store.nnz == np.count_nonzero(data)
+
+    query = data[3] + data[17]
+    expected = [(meta["id"], pytest.approx(d, abs=1e-4)) for meta, d in dense.query(query, top_k=5)]
+    sparse_query = {int(i): float(query[i]) for i in np.flatnonzero(query)}
+    for q in (query, query.tolist(), sparse_query):
+        assert [(meta["id"], d) for meta, d in store.query(q, top_k=5)] == expected
+    assert len(store.query_batch([query, sparse_query], top_k=5)) == 2
+
+
+def test_sparse_store_huge_dimension_and_tombstones():
+    from ai.vector_stores import SparseVectorStore
+
+    store = SparseVectorStore(metadata_fields=["kind"])
+    vectors = [([5, 200_000], [1.0, 2.0]), ([5, 1 << 18], [1.0, 1.0]), ([7], [3.0])]
+    store.add(vectors, [{"id": i, "kind": i % 2} for i in range(3)], ids=["a", "b", "c"])
+    assert store.memory_usage < 200
+    query = ([200_000, 5], [1.0, 1.0])
+    assert [meta["id"] for meta, _ in store.query(query, top_k=3)] == [0, 1, 2]
+    assert store.query(query, top_k=1)[0][1] == pytest.approx(-3.0)
+    assert [meta["id"] for meta, _ in store.query(query, top_k=3, where={"kind": 1})] == [1]
+
+    store.upsert(["a"], [([7], [1.0])], [{"id": 9, "kind": 0}])
+    assert store.delete(["b", "missing"]) == 1
+    assert len(store) == 2
+    before = store.query(([7], [1.0]), top_k=5)
+    store.compact()
+    assert store.nnz == 2 and len(store) == 2
+    assert store.query(([7], [1.0]), top_k=5) == before
+
+
+def test_sparse_store_queries_views_of_growing_buffers():
+    from ai.vector_stores import SparseVectorStore
+
+    store = SparseVectorStore()
+    store.add([([i], [1.0]) for i in range(100)], [{"id": i} for i in range(100)])
+    indices, values, rows, sq_norms = store._snapshot()
+    assert np.shares_memory(values, store._values.view)
+    assert np.shares_memory(rows, store._rows.view)
+
+    store.add([([3], [5.0])], [{"id": 100}])
+    assert values.size == 100 and store.nnz == 101
+    assert store.query(([3], [1.0]), top_k=1)[0][0]["id"] == 100
+    assert [v.tolist() for v in store.get_vector(100)] == [[3], [5.0]]